@@ -2,8 +2,21 @@ import yfinance as yf
 import pandas as pd
 import pandas_ta as ta
 from datetime import datetime
+from pathlib import Path
+import argparse
+import json
 import logging
+import re
+import sys
+import time
 import traceback  # Added import
+from profiling import RunProfiler
+from resampling import ResampleCache, rule_delta, session_for
+
+# The columnar price store lives with the backend database so both sides share bars
+BACKEND_DATABASE_DIR = Path(__file__).resolve().parent.parent / 'backend' / 'src' / 'database'
+sys.path.append(str(BACKEND_DATABASE_DIR))
+from price_store import PriceStore, to_epoch_seconds
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -12,7 +25,30 @@ logger = logging.getLogger(__name__)
 # Configuration
 TICKER = "RELIANCE.NS"  # NSE symbol
 INTERVAL = "15m"        # 15-minute interval
-PERIOD = "5d"          # Increased to 5 days to get more data points
+PERIOD = "60d"          # Longest 15m history yfinance serves; enough daily bars for the slower timeframes
+TICKERS = [TICKER]      # Symbols processed by a multi-symbol run
+
+# Higher timeframes derived from the INTERVAL bars, with their weight in the confluence score
+TIMEFRAME_WEIGHTS = {"15m": 1.0, "1h": 1.5, "4h": 2.0, "1d": 2.5}
+MIN_TIMEFRAME_BARS = 30  # Timeframes with fewer bars than this are left out of the score
+
+# Instrumentation output
+PROFILE_OUTPUT = "trading_profile.jsonl"  # One JSON summary per run
+CPROFILE_OUTPUT = "trading_bot.prof"      # Written only when --profile is passed
+
+# Shared bar storage
+PRICE_STORE_PATH = BACKEND_DATABASE_DIR / "price_store"
+RESAMPLED_STORE_PATH = PRICE_STORE_PATH / "resampled"  # Completed higher-timeframe buckets
+USE_PRICE_STORE = True  # Read windows from the store and only download when it is stale
+
+DURATION_UNITS = {'m': 60, 'h': 3600, 'd': 86400, 'wk': 604800, 'mo': 2592000, 'y': 31536000}
+
+def duration_seconds(text):
+    # yfinance-style durations such as "15m", "1h", "5d", "3mo"
+    match = re.fullmatch(r'(\d+)(m|h|d|wk|mo|y)', text)
+    if not match:
+        raise ValueError(f"Unsupported duration: {text}")
+    return int(match.group(1)) * DURATION_UNITS[match.group(2)]
 
 # Fetch OHLCV data
 def fetch_data(ticker, interval, period):
@@ -31,11 +67,45 @@ def fetch_data(ticker, interval, period):
         logger.error(f"Error fetching data: {str(e)}")
         return None
 
+# Fetch OHLCV data through the columnar store: append any newly downloaded bars,
+# then read the requested window back as memory-mapped columns
+def load_data(ticker, interval, period, store=None):
+    if store is None:
+        return fetch_data(ticker, interval, period)
+
+    bar_seconds = duration_seconds(interval)
+    now = int(time.time())
+    last = store.last_ts(ticker)
+
+    # Skip the download while the newest stored bar is still the latest completed one
+    if last is None or last + 2 * bar_seconds <= now:
+        df = fetch_data(ticker, interval, period)
+        if df is not None and not df.empty:
+            index = df.index if df.index.tz is None else df.index.tz_convert('UTC').tz_localize(None)
+            ts = to_epoch_seconds(index.values)
+            # Only completed bars are appended; the store is append-only
+            completed = ts + bar_seconds <= now
+            added = store.append(
+                ticker, ts[completed],
+                **{field: df[field].to_numpy()[completed] for field in ('open', 'high', 'low', 'close', 'volume')}
+            )
+            logger.info(f"Appended {added} bars for {ticker} to the price store")
+    else:
+        logger.info(f"Price store for {ticker} is current; skipping download")
+
+    window = store.window(ticker, start=now - duration_seconds(period))
+    if window is None or len(window['ts']) == 0:
+        return None
+
+    # Columns are views over the memory-mapped files; pandas may still consolidate them into one block
+    index = pd.to_datetime(window['ts'], unit='s', utc=True)
+    return pd.DataFrame({field: window[field] for field in ('open', 'high', 'low', 'close', 'volume')}, index=index, copy=False)
+
 # Breakout Strategy
 def breakout_strategy(df, window=10):  # Reduced from 20 to 10
     df = df.copy()
     
-    print("Available columns:", df.columns.tolist())
+    logger.debug(f"Available columns: {df.columns.tolist()}")
     
     # No need to check for capitalization since we standardized in fetch_data
     required_columns = ['high', 'low', 'close']
@@ -93,10 +163,15 @@ def bollinger_reversal(df, window=14):  # Changed from 20 to 14
     return df[['long', 'short']]
 
 # Combine signals
-def combined_signals(df):
-    df1 = breakout_strategy(df.copy())
-    df2 = trend_following(df.copy())
-    df3 = bollinger_reversal(df.copy())
+def combined_signals(df, profiler=None):
+    profiler = profiler or RunProfiler(enabled=False)
+    
+    with profiler.stage('combined_signals.breakout_strategy', rows=len(df)):
+        df1 = breakout_strategy(df.copy())
+    with profiler.stage('combined_signals.trend_following', rows=len(df)):
+        df2 = trend_following(df.copy())
+    with profiler.stage('combined_signals.bollinger_reversal', rows=len(df)):
+        df3 = bollinger_reversal(df.copy())
     
     signals = pd.DataFrame(index=df.index)
     
@@ -122,23 +197,57 @@ def combined_signals(df):
     
     return signals
 
+# Multi-timeframe confluence
+resample_caches = {}
+
+def multi_timeframe_signals(df, ticker, profiler=None, base_signals=None):
+    profiler = profiler or RunProfiler(enabled=False)
+    higher = [tf for tf in TIMEFRAME_WEIGHTS if tf != INTERVAL]
+    cache = resample_caches.get(ticker)
+    if cache is None:
+        stores = {tf: PriceStore(RESAMPLED_STORE_PATH, tf) for tf in higher} if USE_PRICE_STORE else None
+        cache = resample_caches[ticker] = ResampleCache(ticker, higher, session_for(ticker), stores)
+
+    with profiler.stage('multi_timeframe.resample', rows=len(df)):
+        frames = {INTERVAL: df, **cache.update(df)}
+
+    base_end = df.index + rule_delta(INTERVAL)
+    directions = {}
+    for timeframe, frame in frames.items():
+        if len(frame) < MIN_TIMEFRAME_BARS:
+            logger.warning(f"Only {len(frame)} {timeframe} bars for {ticker}; leaving {timeframe} out of the confluence score")
+            continue
+        if timeframe == INTERVAL and base_signals is not None:
+            signals = base_signals  # Already computed for this run
+        else:
+            with profiler.stage(f'multi_timeframe.{timeframe}', rows=len(frame)):
+                signals = combined_signals(frame)
+        direction = (signals['LONG'].astype(int) - signals['SHORT'].astype(int)) * signals['signal_strength'] / 3
+        # A higher-timeframe bar is only known once it closes: index it by its end time and carry
+        # it forward onto the base bars that end at or after that point
+        direction.index = frame.index + rule_delta(timeframe)
+        directions[timeframe] = direction.reindex(base_end, method='ffill').fillna(0).to_numpy()
+
+    result = pd.DataFrame({tf: values for tf, values in directions.items()}, index=df.index)
+    weights = pd.Series({tf: TIMEFRAME_WEIGHTS[tf] for tf in directions})
+    result['confluence'] = (result[weights.index] * weights).sum(axis=1) / weights.sum() if len(weights) else 0.0
+    return result
+
 # Run
-def run_strategy():
+def run_strategy(ticker=TICKER, profiler=None, store=None):
+    profiler = profiler or RunProfiler(enabled=False)
     try:
-        # Add file handler for debugging
-        file_handler = logging.FileHandler('trading_bot.log')
-        file_handler.setLevel(logging.INFO)
-        logger.addHandler(file_handler)
-        
-        logger.info(f"Starting strategy run for {TICKER}")
-        df = fetch_data(TICKER, INTERVAL, PERIOD)
+        logger.info(f"Starting strategy run for {ticker}")
+        with profiler.stage('fetch_data') as stage:
+            df = load_data(ticker, INTERVAL, PERIOD, store)
+            stage['rows'] = 0 if df is None else len(df)
         if df is None or df.empty:
             logger.error("No data available for processing")
-            return
+            return None
 
         analysis_output = []  # Store output for both console and file
         
-        analysis_output.append(f"\nAnalyzing {TICKER} data:")
+        analysis_output.append(f"\nAnalyzing {ticker} data:")
         analysis_output.append(f"Timeframe: {INTERVAL}")
         analysis_output.append(f"Period: {PERIOD}")
         analysis_output.append(f"Data points: {len(df)}")
@@ -154,7 +263,8 @@ def run_strategy():
         analysis_output.append(f"\nCurrent price: {recent_close:.2f}")
         analysis_output.append(f"Price change: {price_change:.2f}%")
 
-        signals = combined_signals(df)
+        with profiler.stage('combined_signals', rows=len(df)):
+            signals = combined_signals(df, profiler)
         filtered_signals = signals[signals['LONG'] | signals['SHORT']]
         
         if filtered_signals.empty:
@@ -172,17 +282,55 @@ def run_strategy():
             analysis_output.append("\nActive trading signals found:")
             analysis_output.append(str(filtered_signals.tail()))
         
-        # Write to both console and file
-        output_text = '\n'.join(analysis_output)
-        print(output_text)
-        with open('trading_output.txt', 'w') as f:
-            f.write(output_text)
+        with profiler.stage('multi_timeframe', rows=len(df)):
+            confluence = multi_timeframe_signals(df, ticker, profiler, base_signals=signals)
+        analysis_output.append("\nMulti-timeframe confluence (-1 = all short, +1 = all long):")
+        analysis_output.append(str(confluence.tail()))
+        
+        return '\n'.join(analysis_output)
             
     except Exception as e:
-        error_msg = f"Error in strategy execution: {str(e)}\n{traceback.format_exc()}"
+        error_msg = f"Error in strategy execution for {ticker}: {str(e)}\n{traceback.format_exc()}"
         logger.error(error_msg)
-        with open('trading_error.txt', 'w') as f:
+        with open('trading_error.txt', 'a') as f:
             f.write(error_msg)
+        return None
+
+def run_all(tickers=TICKERS, profile=False, profile_memory=False):
+    # Add file handler for debugging
+    file_handler = logging.FileHandler('trading_bot.log')
+    file_handler.setLevel(logging.INFO)
+    logger.addHandler(file_handler)
+
+    profiler = RunProfiler(
+        track_memory=profile_memory, cprofile_path=CPROFILE_OUTPUT if profile else None
+    ).start()
+    store = PriceStore(PRICE_STORE_PATH, INTERVAL) if USE_PRICE_STORE else None
+    try:
+        outputs = []
+        for ticker in tickers:
+            with profiler.for_symbol(ticker):
+                output_text = run_strategy(ticker, profiler, store)
+                if output_text is None:
+                    continue
+                # Write to both console and file
+                with profiler.stage('write_output', rows=output_text.count('\n') + 1):
+                    print(output_text)
+                    outputs.append(output_text)
+
+        with profiler.stage('write_output', rows=len(outputs)):
+            with open('trading_output.txt', 'w') as f:
+                f.write('\n'.join(outputs))
+    finally:
+        profiler.stop()
+        summary = profiler.write_json(PROFILE_OUTPUT)
+        logger.info(f"Run profile: {json.dumps(summary, default=str)}")
+        logger.removeHandler(file_handler)
 
 if __name__ == "__main__":
-    run_strategy()
+    parser = argparse.ArgumentParser(description="Run the HedgeX trading strategies")
+    parser.add_argument('--tickers', nargs='+', default=TICKERS, help="Symbols to analyse")
+    parser.add_argument('--profile', action='store_true', help=f"Dump a cProfile trace to {CPROFILE_OUTPUT}")
+    parser.add_argument('--profile-memory', action='store_true', help="Record peak memory per stage (slows the run)")
+    args = parser.parse_args()
+    run_all(args.tickers, profile=args.profile, profile_memory=args.profile_memory)
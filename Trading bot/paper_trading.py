@@ -0,0 +1,397 @@
+import argparse
+import logging
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from main import BACKEND_DATABASE_DIR, INTERVAL, PERIOD, PRICE_STORE_PATH, TICKERS, combined_signals, load_data
+from price_store import PriceStore
+
+logger = logging.getLogger(__name__)
+
+# The dashboard's live database; paper results are never written here
+LIVE_DATABASE_PATH = BACKEND_DATABASE_DIR / "hedgex.db"
+
+# Engine defaults
+STARTING_CASH = 100000.0
+MAX_POSITION_NOTIONAL = 10000.0  # Target size at full signal strength
+MAX_SIGNAL_STRENGTH = 3          # Three strategies vote in combined_signals
+LATENCY_BARS = 1                 # Decisions at bar t close fill from bar t + LATENCY_BARS
+LIMIT_TTL_BARS = 5               # Unfilled limit orders expire after this many bars
+FLUSH_EVERY_BARS = 50            # Positions are written to SQLite in batches
+
+# The backend's portfolio tables, so a paper database can be served by the dashboard as is
+PAPER_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS portfolio (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        cash REAL NOT NULL,
+        total_value REAL NOT NULL,
+        daily_change REAL,
+        daily_change_percent REAL,
+        weekly_change REAL,
+        weekly_change_percent REAL,
+        monthly_change REAL,
+        monthly_change_percent REAL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS portfolio_holdings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        stock_id TEXT NOT NULL,
+        shares INTEGER NOT NULL,
+        avg_cost REAL NOT NULL
+    )
+    ''',
+)
+
+# Slippage models: both take signed order quantities and reference prices as arrays
+class FixedSlippage:
+    def __init__(self, bps=5.0):
+        self.bps = bps
+
+    def apply(self, prices, qty, volume):
+        return prices * (1 + np.sign(qty) * self.bps / 10000)
+
+class VolumeSlippage:
+    # Fixed spread cost plus square-root market impact in the bar's volume
+    def __init__(self, bps=2.0, impact=0.1):
+        self.bps = bps
+        self.impact = impact
+
+    def apply(self, prices, qty, volume):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            participation = np.where(volume > 0, np.abs(qty) / volume, 0.0)
+        cost = self.bps / 10000 + self.impact * np.sqrt(participation)
+        return prices * (1 + np.sign(qty) * cost)
+
+# Vectorised paper broker. Positions and the pending order book are flat NumPy
+# arrays indexed by symbol, so matching a bar is a handful of array operations
+# no matter how many symbols are trading.
+#
+# Long-only unless allow_short: the dashboard's holdings have no notion of a short,
+# so sells are cut to what the position holds after the sells already pending.
+class PaperBroker:
+    def __init__(self, symbols, cash=STARTING_CASH, slippage=None, latency_bars=LATENCY_BARS,
+                 limit_ttl_bars=LIMIT_TTL_BARS, allow_short=False):
+        self.symbols = list(symbols)
+        self.cash = float(cash)
+        self.allow_short = allow_short
+        self.slippage = slippage or FixedSlippage()
+        self.latency_bars = max(1, latency_bars)
+        self.limit_ttl_bars = limit_ttl_bars
+
+        n = len(self.symbols)
+        self.position = np.zeros(n)
+        self.avg_cost = np.zeros(n)
+        self.last_price = np.full(n, np.nan)
+        self.realized_pnl = 0.0
+        self.dirty = np.zeros(n, dtype=bool)
+        self.synced = False
+
+        # Pending order book, one entry per order
+        self._sym = np.empty(0, dtype=np.intp)
+        self._qty = np.empty(0)
+        self._limit = np.empty(0)       # NaN for market orders
+        self._ready = np.empty(0, dtype=np.int64)
+        self._decided_ns = np.empty(0, dtype=np.int64)
+
+        self.orders_submitted = 0
+        self.orders_filled = 0
+        self.orders_expired = 0
+        self.fill_latency_ns = []
+        self.fill_latency_bars = []
+
+    def submit(self, bar, symbol_index, qty, limit=None):
+        symbol_index = np.asarray(symbol_index, dtype=np.intp)
+        qty = np.asarray(qty, dtype=float)
+        if not self.allow_short:
+            qty = np.where(qty < 0, self._cap_sells(symbol_index, qty), qty)
+        live = qty != 0
+        symbol_index, qty = symbol_index[live], qty[live]
+        if limit is None:
+            limit = np.full(len(qty), np.nan)
+        else:
+            limit = np.broadcast_to(np.asarray(limit, dtype=float), live.shape)[live]
+
+        self._sym = np.concatenate([self._sym, symbol_index])
+        self._qty = np.concatenate([self._qty, qty])
+        self._limit = np.concatenate([self._limit, limit])
+        self._ready = np.concatenate([self._ready, np.full(len(qty), bar + self.latency_bars)])
+        self._decided_ns = np.concatenate([self._decided_ns, np.full(len(qty), time.perf_counter_ns())])
+        self.orders_submitted += len(qty)
+
+    def _cap_sells(self, symbol_index, qty):
+        # Pending buys may still expire, so only pending sells count against the position
+        pending_sells = np.bincount(self._sym, weights=np.minimum(self._qty, 0), minlength=len(self.symbols))
+        available = np.maximum(self.position + pending_sells, 0)
+        # Running total of each symbol's sells in submission order, capped at what is
+        # available; the capped total's steps are the quantities that may go out
+        order = np.argsort(symbol_index, kind='stable')
+        sym, sells = symbol_index[order], np.minimum(qty[order], 0)
+        running = np.cumsum(sells)
+        first = np.r_[True, sym[1:] != sym[:-1]]
+        group_start = np.maximum.accumulate(np.where(first, np.arange(len(sym)), 0))
+        running -= (running - sells)[group_start]
+        capped = np.maximum(running, -available[sym])
+        steps = np.diff(capped, prepend=0.0)
+        steps[first] = capped[first]
+        result = np.empty_like(qty)
+        result[order] = steps
+        return result
+
+    def on_bar(self, bar, open_, high, low, close, volume):
+        self.last_price = np.where(np.isnan(close), self.last_price, close)
+        if len(self._qty) == 0:
+            return 0
+
+        sym, qty, limit = self._sym, self._qty, self._limit
+        eligible = (self._ready <= bar) & ~np.isnan(open_[sym])
+        is_market = np.isnan(limit)
+        buy = qty > 0
+
+        # Market orders take the bar open; limits fill when the bar trades through them, at the better of open and limit
+        touched = np.where(buy, low[sym] <= limit, high[sym] >= limit)
+        fills = eligible & (is_market | touched)
+        base_price = np.where(is_market, open_[sym], np.where(buy, np.minimum(open_[sym], limit), np.maximum(open_[sym], limit)))
+
+        fill_sym = sym[fills]
+        fill_qty = qty[fills]
+        fill_price = np.where(
+            is_market[fills],
+            self.slippage.apply(base_price[fills], fill_qty, volume[fill_sym]),
+            base_price[fills],
+        )
+        if len(fill_sym):
+            self._apply_fills(fill_sym, fill_qty, fill_price)
+            now = time.perf_counter_ns()
+            self.fill_latency_ns.append(now - self._decided_ns[fills])
+            self.fill_latency_bars.append(bar - (self._ready[fills] - self.latency_bars))
+            self.orders_filled += len(fill_sym)
+
+        expired = eligible & ~fills & (self._ready + self.limit_ttl_bars <= bar)
+        self.orders_expired += int(expired.sum())
+        keep = ~(fills | expired)
+        self._sym, self._qty, self._limit = sym[keep], qty[keep], limit[keep]
+        self._ready, self._decided_ns = self._ready[keep], self._decided_ns[keep]
+        return len(fill_sym)
+
+    def _apply_fills(self, fill_sym, fill_qty, fill_price):
+        n = len(self.symbols)
+        # Net several fills of one symbol into a single quantity at their average price
+        dq = np.bincount(fill_sym, weights=fill_qty, minlength=n)
+        notional = np.bincount(fill_sym, weights=fill_qty * fill_price, minlength=n)
+        touched = np.flatnonzero(np.bincount(fill_sym, minlength=n))
+        dq, notional = dq[touched], notional[touched]
+
+        self.cash -= notional.sum()
+        pos = self.position[touched]
+        avg = self.avg_cost[touched]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            px = np.where(dq != 0, notional / dq, avg)
+        new_pos = pos + dq
+
+        adding = (pos == 0) | (np.sign(pos) == np.sign(dq))
+        closed_qty = np.where(adding, 0.0, np.minimum(np.abs(dq), np.abs(pos)))
+        self.realized_pnl += float(np.sum(closed_qty * (px - avg) * np.sign(pos)))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            added_avg = (pos * avg + dq * px) / new_pos
+        flipped = ~adding & (np.sign(new_pos) != np.sign(pos)) & (new_pos != 0)
+        new_avg = np.where(adding, added_avg, np.where(flipped, px, avg))
+        new_avg = np.where(new_pos == 0, 0.0, new_avg)
+
+        self.position[touched] = new_pos
+        self.avg_cost[touched] = new_avg
+        self.dirty[touched] = True
+
+    def pending_qty(self):
+        return np.bincount(self._sym, weights=self._qty, minlength=len(self.symbols))
+
+    def equity(self):
+        marks = np.nan_to_num(self.last_price, nan=0.0)
+        return self.cash + float(np.dot(self.position, marks))
+
+    def latency_stats(self):
+        if not self.fill_latency_ns:
+            return {}
+        ns = np.concatenate(self.fill_latency_ns)
+        bars = np.concatenate(self.fill_latency_bars)
+        return {
+            "fills": int(len(ns)),
+            "p50_ms": float(np.percentile(ns, 50) / 1e6),
+            "p99_ms": float(np.percentile(ns, 99) / 1e6),
+            "mean_bars": float(bars.mean()),
+        }
+
+    # Batched write of changed positions into the paper database's portfolio_holdings
+    # plus the portfolio totals. The first write replaces the whole book, so the
+    # database mirrors this broker and its totals cover every holding in it.
+    def flush(self, db_path):
+        changed = np.flatnonzero(self.dirty) if self.synced else np.arange(len(self.symbols))
+        if len(changed) == 0:
+            return 0
+
+        shares = np.round(self.position[changed])
+        if (shares < 0).any():
+            raise ValueError("Short positions cannot be stored in portfolio_holdings; use allow_short=False")
+        symbols = [self.symbols[i] for i in changed]
+        rows = [
+            (self.symbols[i], int(count), float(self.avg_cost[i]))
+            for i, count in zip(changed, shares) if count != 0
+        ]
+        db = open_paper_database(db_path)
+        try:
+            with db:
+                if not self.synced:
+                    db.execute('DELETE FROM portfolio_holdings')
+                for start in range(0, len(symbols), 500):
+                    chunk = symbols[start:start + 500]
+                    db.execute(f"DELETE FROM portfolio_holdings WHERE stock_id IN ({','.join('?' * len(chunk))})", chunk)
+                db.executemany('INSERT INTO portfolio_holdings (stock_id, shares, avg_cost) VALUES (?, ?, ?)', rows)
+
+                # Marked at the last close seen, or at cost for a symbol without one
+                marks = dict(zip(self.symbols, self.last_price.tolist()))
+                held = db.execute('SELECT stock_id, shares, avg_cost FROM portfolio_holdings').fetchall()
+                total_value = self.cash + sum(
+                    count * (cost if np.isnan(marks.get(symbol, np.nan)) else marks[symbol])
+                    for symbol, count, cost in held
+                )
+
+                latest = db.execute('SELECT id FROM portfolio ORDER BY id DESC LIMIT 1').fetchone()
+                if latest:
+                    db.execute(
+                        'UPDATE portfolio SET cash = ?, total_value = ?, updated_at = ? WHERE id = ?',
+                        (self.cash, total_value, datetime.now(), latest[0])
+                    )
+                else:
+                    db.execute('INSERT INTO portfolio (cash, total_value) VALUES (?, ?)', (self.cash, total_value))
+        finally:
+            db.close()
+
+        self.dirty[changed] = False
+        self.synced = True
+        return len(rows)
+
+# A separate database for paper results, created with the portfolio tables on first use
+def open_paper_database(db_path):
+    if Path(db_path).resolve() == LIVE_DATABASE_PATH.resolve():
+        raise ValueError(f"Refusing to write paper trades into the live database {LIVE_DATABASE_PATH}")
+    db = sqlite3.connect(db_path)
+    for statement in PAPER_SCHEMA:
+        db.execute(statement)
+    return db
+
+# Target positions from combined_signals columns: full MAX_POSITION_NOTIONAL at maximum
+# strength, scaled down linearly; bars with neither signal keep the current position.
+def orders_from_signals(position, long, short, strength, price, max_notional=MAX_POSITION_NOTIONAL):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        size = np.floor(max_notional * np.clip(strength, 0, MAX_SIGNAL_STRENGTH) / MAX_SIGNAL_STRENGTH / price)
+    size = np.nan_to_num(size, nan=0.0, posinf=0.0)
+    direction = long.astype(int) - short.astype(int)
+    target = np.where(direction != 0, direction * size, position)
+    return target - position
+
+def align_frames(frames, columns):
+    index = pd.DatetimeIndex(sorted(set().union(*(frame.index for frame in frames.values()))))
+    return index, {
+        column: np.column_stack([frames[s][column].reindex(index).to_numpy(dtype=float) for s in frames])
+        for column in columns
+    }
+
+def simulate(broker, bars, signals, flush_every=FLUSH_EVERY_BARS, db_path=None, limit_offset_bps=None):
+    # bars/signals: dicts of (bars x symbols) arrays. Fills happen before the bar's decision.
+    # With limit_offset_bps, orders rest as limits that far inside the decision bar's close.
+    all_symbols = np.arange(len(broker.symbols))
+    for t in range(bars['close'].shape[0]):
+        broker.on_bar(t, bars['open'][t], bars['high'][t], bars['low'][t], bars['close'][t], bars['volume'][t])
+
+        valid = ~np.isnan(bars['close'][t])
+        # Size against what the book will hold once pending orders fill, so signals are not re-sent every bar
+        qty = orders_from_signals(
+            broker.position + broker.pending_qty(), signals['LONG'][t] > 0, signals['SHORT'][t] > 0,
+            np.nan_to_num(signals['signal_strength'][t]), bars['close'][t]
+        )
+        qty = np.where(valid, qty, 0.0)
+        limit = None
+        if limit_offset_bps is not None:
+            limit = bars['close'][t] * (1 - np.sign(qty) * limit_offset_bps / 10000)
+        broker.submit(t, all_symbols, qty, limit)
+
+        if db_path is not None and (t + 1) % flush_every == 0:
+            broker.flush(db_path)
+    if db_path is not None:
+        broker.flush(db_path)
+    return broker
+
+# Results are only persisted when db_path names a paper database
+def run_paper_trading(tickers=TICKERS, db_path=None):
+    store = PriceStore(PRICE_STORE_PATH, INTERVAL)
+    frames, signal_frames = {}, {}
+    for ticker in tickers:
+        df = load_data(ticker, INTERVAL, PERIOD, store)
+        if df is None or df.empty:
+            logger.warning(f"No data for {ticker}; skipping")
+            continue
+        frames[ticker] = df
+        signal_frames[ticker] = combined_signals(df)[['LONG', 'SHORT', 'signal_strength']].astype(float)
+
+    if not frames:
+        logger.error("No data available for paper trading")
+        return None
+
+    _, bars = align_frames(frames, ['open', 'high', 'low', 'close', 'volume'])
+    _, signals = align_frames(signal_frames, ['LONG', 'SHORT', 'signal_strength'])
+    broker = simulate(PaperBroker(list(frames)), bars, signals, db_path=db_path)
+    logger.info(f"Paper trading done: equity={broker.equity():.2f} realized={broker.realized_pnl:.2f} "
+                f"orders={broker.orders_submitted} fills={broker.orders_filled} latency={broker.latency_stats()}")
+    return broker
+
+# Synthetic throughput benchmark: random-walk bars and random signals for many symbols
+def benchmark(symbols=5000, bars=200, seed=7, limit_offset_bps=None):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.01, (bars, symbols)), axis=0)
+    open_ = close * (1 + rng.normal(0, 0.002, close.shape))
+    data = {
+        'open': open_,
+        'high': np.maximum(open_, close) * 1.005,
+        'low': np.minimum(open_, close) * 0.995,
+        'close': close,
+        'volume': rng.integers(10000, 1000000, close.shape).astype(float),
+    }
+    strength = rng.integers(0, 4, close.shape).astype(float)
+    side = rng.random(close.shape)
+    signals = {
+        'LONG': ((side < 0.2) & (strength >= 2)).astype(float),
+        'SHORT': ((side > 0.8) & (strength >= 2)).astype(float),
+        'signal_strength': strength,
+    }
+
+    broker = PaperBroker([f"SYM{i}" for i in range(symbols)], cash=1e9, allow_short=True)
+    start = time.perf_counter()
+    simulate(broker, data, signals, limit_offset_bps=limit_offset_bps)
+    elapsed = time.perf_counter() - start
+
+    print(f"symbols={symbols} bars={bars} elapsed={elapsed:.3f}s per_bar={elapsed / bars * 1000:.2f} ms")
+    print(f"orders={broker.orders_submitted} fills={broker.orders_filled} expired={broker.orders_expired} "
+          f"orders/s={broker.orders_submitted / elapsed:,.0f} fills/s={broker.orders_filled / elapsed:,.0f}")
+    print(f"decision->fill latency: {broker.latency_stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Paper-trade combined_signals against incoming bars")
+    parser.add_argument('--tickers', nargs='+', default=TICKERS)
+    parser.add_argument('--db', type=Path, default=None,
+                        help="Paper portfolio database to write positions to (never the live hedgex.db)")
+    parser.add_argument('--bench', action='store_true', help="Run the synthetic throughput benchmark instead")
+    parser.add_argument('--symbols', type=int, default=5000)
+    parser.add_argument('--bars', type=int, default=200)
+    parser.add_argument('--limit-bps', type=float, default=None, help="Benchmark with limit orders this far inside the close")
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.symbols, args.bars, limit_offset_bps=args.limit_bps)
+    else:
+        run_paper_trading(args.tickers, args.db)
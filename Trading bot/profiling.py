@@ -0,0 +1,119 @@
+import cProfile
+import json
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+# Collects wall/CPU time, rows processed and peak traced memory per pipeline stage.
+# Stages are grouped by symbol so multi-symbol runs can be compared side by side.
+# Memory tracking is opt-in: tracemalloc slows allocation-heavy pandas code enough
+# to distort the wall and CPU times recorded alongside it.
+class RunProfiler:
+    def __init__(self, enabled=True, track_memory=False, cprofile_path=None):
+        self.enabled = enabled
+        self.track_memory = enabled and track_memory
+        self.cprofile_path = cprofile_path
+        self.started_at = datetime.now()
+        self.stages = []
+        self.symbol = None
+        self._profile = None
+        self._started_tracing = False
+        self._open_peaks = []
+
+    def start(self):
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if self.cprofile_path:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        return self
+
+    def stop(self):
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self.cprofile_path)
+            logger.info(f"cProfile trace written to {self.cprofile_path}")
+            self._profile = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def for_symbol(self, symbol):
+        previous, self.symbol = self.symbol, symbol
+        try:
+            yield self
+        finally:
+            self.symbol = previous
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        if not self.enabled:
+            yield {}
+            return
+
+        record = {"symbol": self.symbol, "stage": name, "rows": rows}
+        if self.track_memory:
+            # Resetting would lose the parent's peak so far, so fold it in first
+            if self._open_peaks:
+                self._open_peaks[-1] = max(self._open_peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            mem_before = tracemalloc.get_traced_memory()[0]
+        self._open_peaks.append(0)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            # Callers may fill in `rows` once the stage knows how much it produced
+            yield record
+        finally:
+            record["wall_ms"] = round((time.perf_counter() - wall_start) * 1000, 3)
+            record["cpu_ms"] = round((time.process_time() - cpu_start) * 1000, 3)
+            # A nested stage resets the tracemalloc peak, so fold its peak back into ours
+            peak = self._open_peaks.pop()
+            if self.track_memory:
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                record["peak_mem_kb"] = round(max(peak - mem_before, 0) / 1024, 1)
+                if self._open_peaks:
+                    self._open_peaks[-1] = max(self._open_peaks[-1], peak)
+            self.stages.append(record)
+
+    def summary(self):
+        symbols = {}
+        for record in self.stages:
+            key = record["symbol"] or "_run"
+            entry = symbols.setdefault(key, {"wall_ms": 0.0, "cpu_ms": 0.0, "peak_mem_kb": 0.0, "stages": {}})
+            stage = entry["stages"].setdefault(record["stage"], {"calls": 0, "wall_ms": 0.0, "cpu_ms": 0.0, "rows": 0, "peak_mem_kb": 0.0})
+            stage["calls"] += 1
+            stage["wall_ms"] += record["wall_ms"]
+            stage["cpu_ms"] += record["cpu_ms"]
+            stage["rows"] += record["rows"] or 0
+            stage["peak_mem_kb"] = max(stage["peak_mem_kb"], record.get("peak_mem_kb", 0.0))
+            entry["peak_mem_kb"] = max(entry["peak_mem_kb"], record.get("peak_mem_kb", 0.0))
+            # Nested stages (strategies inside combined_signals) would double count
+            if "." not in record["stage"]:
+                entry["wall_ms"] += record["wall_ms"]
+                entry["cpu_ms"] += record["cpu_ms"]
+
+        # Slowest stage across all symbols, ignoring the parent stages that contain others
+        parents = {r["stage"].rsplit(".", 1)[0] for r in self.stages if "." in r["stage"]}
+        leaf_stages = [r for r in self.stages if r["stage"] not in parents]
+        slowest = max(leaf_stages, key=lambda r: r["wall_ms"], default=None)
+
+        return {
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.now().isoformat(),
+            "symbols": symbols,
+            "slowest_stage": slowest,
+        }
+
+    def write_json(self, path):
+        summary = self.summary()
+        with open(path, 'a') as f:
+            f.write(json.dumps(summary, default=str) + '\n')
+        return summary
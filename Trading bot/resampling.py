@@ -0,0 +1,116 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Exchange sessions used to align intraday buckets, by Yahoo ticker suffix:
+# (exchange timezone, regular session open). Tickers without a suffix are US listings.
+EXCHANGE_SESSIONS = {
+    '.NS': ('Asia/Kolkata', '09:15'),
+    '.BO': ('Asia/Kolkata', '09:15'),
+    '.L': ('Europe/London', '08:00'),
+    '.DE': ('Europe/Berlin', '09:00'),
+    '.PA': ('Europe/Paris', '09:00'),
+    '.AS': ('Europe/Amsterdam', '09:00'),
+    '.SW': ('Europe/Zurich', '09:00'),
+    '.T': ('Asia/Tokyo', '09:00'),
+    '.HK': ('Asia/Hong_Kong', '09:30'),
+    '.SS': ('Asia/Shanghai', '09:30'),
+    '.SZ': ('Asia/Shanghai', '09:30'),
+    '.KS': ('Asia/Seoul', '09:00'),
+    '.SI': ('Asia/Singapore', '09:00'),
+    '.AX': ('Australia/Sydney', '10:00'),
+    '.TO': ('America/Toronto', '09:30'),
+}
+US_SESSION = ('America/New_York', '09:30')
+
+OHLCV_AGG = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+# yfinance interval names -> pandas offsets
+RULES = {'15m': '15min', '30m': '30min', '1h': '1h', '2h': '2h', '4h': '4h', '1d': '1D'}
+
+def rule_delta(interval):
+    return pd.Timedelta(RULES[interval])
+
+def session_for(ticker):
+    suffix = ticker[ticker.rfind('.'):].upper() if '.' in ticker else ''
+    if not suffix:
+        return US_SESSION
+    session = EXCHANGE_SESSIONS.get(suffix)
+    if session is None:
+        logger.warning(f"No exchange session known for {ticker}; aligning buckets on UTC midnight")
+        return ('UTC', '00:00')
+    return session
+
+def resample_ohlcv(df, interval, tz, session_open):
+    index = df.index if df.index.tz is not None else df.index.tz_localize('UTC')
+    local = df.set_axis(index.tz_convert(tz))
+
+    if interval == '1d':
+        # Calendar days in exchange time
+        resampled = local.resample('1D').agg(OHLCV_AGG)
+    else:
+        # Buckets start at the session open (09:15, 10:15, ... for 1h on NSE), so the first bar of the day is never split
+        hours, minutes = (int(part) for part in session_open.split(':'))
+        resampled = local.resample(
+            RULES[interval], origin='start_day', offset=pd.Timedelta(hours=hours, minutes=minutes),
+            label='left', closed='left'
+        ).agg(OHLCV_AGG)
+
+    # Buckets outside the session have no trades
+    resampled = resampled.dropna(subset=['open'])
+    return resampled.set_axis(resampled.index.tz_convert('UTC'))
+
+# Resampled frames per timeframe, extended incrementally. Only the last cached
+# bucket (which may have been partial) and anything after it is recomputed.
+#
+# With `stores` (interval -> PriceStore) completed buckets are also appended to
+# disk, so a new process starts from them rather than resampling the whole base
+# window again. A bucket is complete once the base has a bar at or after its end;
+# base bars are append-only, so a completed bucket never changes.
+class ResampleCache:
+    def __init__(self, symbol, intervals, session, stores=None):
+        self.symbol = symbol
+        self.intervals = list(intervals)
+        self.tz, self.session_open = session
+        self.stores = stores or {}
+        self.frames = {}
+
+    def _resample(self, base, interval):
+        return resample_ohlcv(base, interval, self.tz, self.session_open)
+
+    def _load(self, interval, start):
+        store = self.stores.get(interval)
+        window = store.window(self.symbol, start=int(start.timestamp())) if store is not None else None
+        if window is None or len(window['ts']) == 0:
+            return None
+        index = pd.to_datetime(window['ts'], unit='s', utc=True)
+        return pd.DataFrame({field: window[field] for field in OHLCV_AGG}, index=index)
+
+    def _persist(self, interval, frame, base):
+        store = self.stores.get(interval)
+        if store is None:
+            return 0
+        complete = frame[frame.index + rule_delta(interval) <= base.index[-1]]
+        if complete.empty:
+            return 0
+        # The store skips buckets at or before the last one it holds
+        ts = complete.index.tz_convert('UTC').tz_localize(None).values.astype('datetime64[s]').astype(np.int64)
+        return store.append(self.symbol, ts, **{field: complete[field].to_numpy(dtype=float) for field in OHLCV_AGG})
+
+    def update(self, base):
+        for interval in self.intervals:
+            cached = self.frames.get(interval)
+            if cached is None:
+                cached = self._load(interval, base.index[0] - rule_delta(interval))
+            if cached is None or cached.empty or base.index[0] > cached.index[-1]:
+                self.frames[interval] = self._resample(base, interval)
+            else:
+                last_bucket = cached.index[-1]
+                fresh = self._resample(base[base.index >= last_bucket], interval)
+                # Drop buckets that have fallen out of the base window
+                kept = cached[(cached.index < last_bucket) & (cached.index >= base.index[0] - rule_delta(interval))]
+                self.frames[interval] = pd.concat([kept, fresh])
+            self._persist(interval, self.frames[interval], base)
+        return self.frames
@@ -0,0 +1,124 @@
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Make the backend package importable when run as a script, as run.py does
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+sys.path.append(str(backend_dir / 'src'))
+
+import aiosqlite
+from src.services.alerts import AlertEngine
+
+# `alerts` active alerts spread over `symbols` symbols, thresholds within +-10% of
+# the start price, driven by a random walk of single-symbol ticks. Compares the
+# bisect engine against scanning every alert on the ticked symbol, then times the
+# batched persistence of everything that fired.
+
+def build_alerts(symbols, count, rng):
+    prices = {f'S{i:04d}': rng.uniform(20, 500) for i in range(symbols)}
+    names = list(prices)
+    alerts = []
+    for alert_id in range(1, count + 1):
+        symbol = names[alert_id % symbols]
+        metric = 'price' if rng.random() < 0.75 else 'change_percent'
+        direction = rng.choice(('above', 'below'))
+        threshold = prices[symbol] * rng.uniform(0.9, 1.1) if metric == 'price' else rng.uniform(-10, 10)
+        alerts.append((alert_id, f'user{alert_id % 5000}@bench.local', symbol, metric, direction, threshold))
+    return prices, alerts
+
+def build_ticks(prices, count, rng):
+    last = dict(prices)
+    names = list(prices)
+    ticks = []
+    for _ in range(count):
+        symbol = rng.choice(names)
+        last[symbol] *= 1 + rng.gauss(0, 0.002)
+        ticks.append((symbol, last[symbol]))
+    return ticks
+
+def naive_scan(alerts_by_symbol, reference, last, symbol, price):
+    # Baseline: every alert on the symbol is compared on every tick
+    previous = last.get(symbol, price)
+    last[symbol] = price
+    fired = []
+    for alert_id, metric, direction, threshold in alerts_by_symbol[symbol]:
+        if metric == 'price':
+            old, new = previous, price
+        else:
+            old, new = (previous / reference[symbol] - 1) * 100, (price / reference[symbol] - 1) * 100
+        if direction == 'above' and old < threshold <= new or direction == 'below' and new <= threshold < old:
+            fired.append(alert_id)
+    return fired
+
+async def persist(engine, pending):
+    path = Path(tempfile.mkdtemp()) / 'alerts.db'
+    async with aiosqlite.connect(path) as db:
+        await db.execute('''
+            CREATE TABLE alerts (
+                id INTEGER PRIMARY KEY, status TEXT NOT NULL DEFAULT 'active',
+                triggered_at TIMESTAMP, trigger_price REAL
+            )
+        ''')
+        await db.executemany('INSERT INTO alerts (id) VALUES (?)', ((event['id'],) for event in pending))
+        await db.commit()
+        engine.pending = pending
+        start = time.perf_counter()
+        written = await engine.flush(db)
+        return written, time.perf_counter() - start
+
+async def main():
+    parser = argparse.ArgumentParser(description="Alert engine throughput with many active alerts")
+    parser.add_argument('--alerts', type=int, default=1_000_000)
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--ticks', type=int, default=200_000)
+    parser.add_argument('--naive-ticks', type=int, default=2_000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    prices, alerts = build_alerts(args.symbols, args.alerts, rng)
+    ticks = build_ticks(prices, args.ticks, rng)
+
+    engine = AlertEngine()
+    start = time.perf_counter()
+    for symbol, price in prices.items():
+        engine.set_quote(symbol, price, reference=price)
+    engine.load(alerts)
+    load = time.perf_counter() - start
+    print(f"load       alerts={args.alerts} symbols={args.symbols} elapsed={load:.2f} s")
+
+    # Naive baseline first, on its own copy of the state
+    alerts_by_symbol = {symbol: [] for symbol in prices}
+    for alert_id, _, symbol, metric, direction, threshold in alerts:
+        alerts_by_symbol[symbol].append((alert_id, metric, direction, threshold))
+    last = dict(prices)
+    start = time.perf_counter()
+    for symbol, price in ticks[:args.naive_ticks]:
+        naive_scan(alerts_by_symbol, prices, last, symbol, price)
+    naive = (time.perf_counter() - start) / max(1, min(args.naive_ticks, len(ticks)))
+    print(f"naive      ticks={min(args.naive_ticks, len(ticks))} per_tick={naive * 1e6:.1f} us rate={1 / naive:,.0f} ticks/s")
+
+    now = datetime.now()
+    latencies = []
+    start = time.perf_counter()
+    for symbol, price in ticks:
+        tick_start = time.perf_counter()
+        engine.on_tick(symbol, price, now)
+        latencies.append(time.perf_counter() - tick_start)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(f"bisect     ticks={len(ticks)} rate={len(ticks) / elapsed:,.0f} ticks/s "
+          f"p50={latencies[len(latencies) // 2] * 1e6:.1f} us p99={latencies[int(len(latencies) * 0.99)] * 1e6:.1f} us "
+          f"triggered={engine.triggered} remaining={engine.stats()['active']} speedup={naive / (elapsed / len(ticks)):.0f}x")
+
+    written, flush = await persist(engine, engine.pending)
+    print(f"persist    rows={written} elapsed={flush * 1000:.1f} ms ({written / flush if flush else 0:,.0f} rows/s, one batch)")
+
+if __name__ == '__main__':
+    asyncio.run(main())
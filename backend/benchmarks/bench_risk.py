@@ -0,0 +1,121 @@
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+# Make the backend package importable when run as a script, as run.py does
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+sys.path.append(str(backend_dir / 'src'))
+
+import aiosqlite
+import jwt
+import numpy as np
+from src.app import app
+from src.database import database
+from src.database.partitions import upsert_bars
+from src.database.replica import replica
+from src.services.prices import price_cache
+from src.services.risk import return_stats_cache
+# app.py registers the blueprint imported as routes.api, so patch that module instance
+from routes import api
+
+# `holdings` positions with `years` of weekday bars in a throwaway database, then
+# GET /api/portfolio/risk end to end through the test client: cold (empty cache),
+# warm (nothing written since), and right after one new bar per holding.
+
+def weekdays(start, end):
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            yield day
+        day += timedelta(days=1)
+
+async def build_database(path, holdings, years, end, rng):
+    database.DATABASE_PATH = path
+    await database.init_db()
+    symbols = [f'S{i:04d}' for i in range(holdings)]
+    dates = [d.isoformat() for d in weekdays(end - timedelta(days=365 * years), end)]
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, (len(dates), holdings)), axis=0))
+    async with aiosqlite.connect(path) as db:
+        await db.executemany(
+            'INSERT INTO stocks (symbol, name, price, sector) VALUES (?, ?, ?, ?)',
+            [(symbol, symbol, float(closes[-1, i]), 'Bench') for i, symbol in enumerate(symbols)]
+        )
+        await db.executemany(
+            'INSERT INTO portfolio_holdings (stock_id, shares, avg_cost) VALUES (?, ?, ?)',
+            [(symbol, int(rng.integers(1, 100)), 100.0) for symbol in symbols]
+        )
+        for i, symbol in enumerate(symbols):
+            await upsert_bars(db, [
+                (symbol, day, close, close, close, close, 1000) for day, close in zip(dates, closes[:, i].tolist())
+            ])
+        await db.commit()
+    return symbols, closes[-1]
+
+async def append_bar(path, symbols, last_closes, day):
+    async with aiosqlite.connect(path) as db:
+        await upsert_bars(db, [
+            (symbol, day, close, close, close, close, 1000) for symbol, close in zip(symbols, last_closes.tolist())
+        ])
+        await db.commit()
+
+async def timed(client, path, headers, runs):
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        await response.get_data()
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.status_code
+    latencies.sort()
+    return latencies
+
+def report(label, latencies):
+    print(f"{label:<9} runs={len(latencies)} p50={latencies[len(latencies) // 2] * 1000:.1f} ms "
+          f"max={latencies[-1] * 1000:.1f} ms")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Time the portfolio risk endpoint end to end")
+    parser.add_argument('--holdings', type=int, default=500)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--days', type=int, default=1825, help="Lookback window passed to the endpoint")
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    end = date.today() - timedelta(days=3)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'bench.db'
+        start = time.perf_counter()
+        symbols, last_closes = await build_database(path, args.holdings, args.years, end, rng)
+        print(f"built {args.holdings} holdings x {args.years} years in {time.perf_counter() - start:.1f} s")
+
+        # Reads go to the benchmark database; no replica snapshot is ever taken
+        api.DATABASE_PATH = replica.primary = path
+        replica.replica = Path(tmp) / 'bench_replica.db'
+        api.limiter.enabled = False
+        price_cache.clear()
+
+        token = jwt.encode({'email': 'bench@example.com', 'name': 'Bench'}, api.SECRET_KEY, algorithm='HS256')
+        headers = {'Authorization': f'Bearer {token}'}
+        client = app.test_client()
+        url = f'/api/portfolio/risk?days={args.days}'
+
+        report('cold', await timed(client, url, headers, 1))
+        report('warm', await timed(client, url, headers, args.runs))
+        latencies = []
+        for i in range(args.runs):
+            day = end + timedelta(days=i + 1)
+            await append_bar(path, symbols, last_closes, day.isoformat())
+            latencies.extend(await timed(client, url, headers, 1))
+        report('new bar', sorted(latencies))
+        print(f"prices    hits={price_cache.hits} extends={price_cache.extends} loads={price_cache.loads}")
+        print(f"stats     {return_stats_cache.stats()}")
+
+if __name__ == '__main__':
+    asyncio.run(main())
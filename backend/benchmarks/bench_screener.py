@@ -0,0 +1,122 @@
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+# Make the backend package importable when run as a script, as run.py does
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+sys.path.append(str(backend_dir / 'src'))
+
+import aiosqlite
+import numpy as np
+from src.app import app
+from src.database import database
+from src.database.partitions import upsert_bars
+from src.database.replica import replica
+from src.services.prices import price_cache
+# app.py registers the blueprint imported as routes.api, so patch that module instance
+from routes import api
+
+# `symbols` symbols with `bars` weekday bars each in a throwaway database, then
+# POST /api/screener end to end through the test client: cold (empty cache), warm
+# (nothing written since), and right after one new bar per symbol.
+
+CRITERIA = [
+    {"type": "rsi", "length": 14, "min": 40, "max": 70},
+    {"type": "volume_surge", "window": 10, "multiplier": 1.1},
+    {"type": "ema_cross", "fast": 8, "slow": 21, "within": 5},
+]
+
+def weekdays(end, count):
+    days = []
+    day = end
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day.isoformat())
+        day -= timedelta(days=1)
+    return days[::-1]
+
+def bar_rows(symbol, dates, closes, volumes):
+    return [
+        (symbol, day, close, close * 1.01, close * 0.99, close, volume)
+        for day, close, volume in zip(dates, closes, volumes)
+    ]
+
+async def build_database(path, count, bars, end, rng):
+    database.DATABASE_PATH = path
+    await database.init_db()
+    symbols = [f'S{i:04d}' for i in range(count)]
+    dates = weekdays(end, bars)
+    async with aiosqlite.connect(path) as db:
+        for symbol in symbols:
+            closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, bars)))
+            volumes = rng.integers(10_000, 1_000_000, bars)
+            await upsert_bars(db, bar_rows(symbol, dates, closes.tolist(), volumes.tolist()))
+        await db.commit()
+    return symbols
+
+async def append_bar(path, symbols, day, rng):
+    closes = rng.uniform(50, 150, len(symbols)).tolist()
+    volumes = rng.integers(10_000, 1_000_000, len(symbols)).tolist()
+    async with aiosqlite.connect(path) as db:
+        await upsert_bars(db, [
+            row for symbol, close, volume in zip(symbols, closes, volumes)
+            for row in bar_rows(symbol, [day], [close], [volume])
+        ])
+        await db.commit()
+
+async def timed(client, body, runs):
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = await client.post('/api/screener', json=body)
+        await response.get_data()
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.status_code
+    latencies.sort()
+    return latencies
+
+def report(label, latencies):
+    print(f"{label:<9} runs={len(latencies)} p50={latencies[len(latencies) // 2] * 1000:.1f} ms "
+          f"max={latencies[-1] * 1000:.1f} ms")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Time the screener endpoint end to end")
+    parser.add_argument('--symbols', type=int, default=5000)
+    parser.add_argument('--bars', type=int, default=640)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    end = date.today() - timedelta(days=3)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'bench.db'
+        start = time.perf_counter()
+        symbols = await build_database(path, args.symbols, args.bars, end, rng)
+        print(f"built {args.symbols} symbols x {args.bars} bars in {time.perf_counter() - start:.1f} s")
+
+        # Reads go to the benchmark database; no replica snapshot is ever taken
+        api.DATABASE_PATH = replica.primary = path
+        replica.replica = Path(tmp) / 'bench_replica.db'
+        api.limiter.enabled = False
+        price_cache.clear()
+
+        client = app.test_client()
+        body = {"criteria": CRITERIA, "sort": "rsi_14", "limit": 100}
+
+        report('cold', await timed(client, body, 1))
+        report('warm', await timed(client, body, args.runs))
+        latencies = []
+        for i in range(args.runs):
+            await append_bar(path, symbols, (end + timedelta(days=i + 1)).isoformat(), rng)
+            latencies.extend(await timed(client, body, 1))
+        report('new bar', sorted(latencies))
+        print(f"prices    hits={price_cache.hits} extends={price_cache.extends} loads={price_cache.loads}")
+
+if __name__ == '__main__':
+    asyncio.run(main())
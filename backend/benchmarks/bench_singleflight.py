@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Make the backend package importable when run as a script, as run.py does
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+sys.path.append(str(backend_dir / 'src'))
+
+import jwt
+from src.app import app
+from src.database.database import init_db
+# app.py registers the blueprint imported as routes.api, so patch that module instance
+from routes import api
+
+# Thundering herd: `clients` dashboards request the same chart at the same moment,
+# in `waves` rounds. Reports how many range queries actually hit SQLite.
+async def herd(client, path, clients, waves, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    latencies = []
+
+    async def one():
+        start = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        await response.get_data()
+        latencies.append(time.perf_counter() - start)
+        return response.status_code
+
+    start = time.perf_counter()
+    statuses = []
+    for _ in range(waves):
+        statuses.extend(await asyncio.gather(*(one() for _ in range(clients))))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return statuses, elapsed, latencies
+
+async def runaway_poller(client, requests):
+    statuses = [(await client.get('/api/stocks/search?q=A')).status_code for _ in range(requests)]
+    return statuses.count(429)
+
+async def main():
+    parser = argparse.ArgumentParser(description="Measure query coalescing under a thundering herd")
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--waves', type=int, default=5)
+    parser.add_argument('--symbol', default='AAPL')
+    parser.add_argument('--timeframe', default='All')
+    parser.add_argument('--limit', type=int, default=1000, help="Page size; only paged historical requests are coalesced")
+    args = parser.parse_args()
+
+    await init_db()
+    token = jwt.encode({'email': 'bench@example.com', 'name': 'Bench'}, api.SECRET_KEY, algorithm='HS256')
+    client = app.test_client()
+
+    # The herd shares one token, so lift the per-client budget for this part
+    api.limiter.enabled = False
+    for label, path in [
+        ('historical', f'/api/stocks/{args.symbol}/historical?timeframe={args.timeframe}&limit={args.limit}'),
+        ('allocation', '/api/portfolio/allocation'),
+    ]:
+        before = api.query_flight.stats()
+        statuses, elapsed, latencies = await herd(client, path, args.clients, args.waves, token)
+        after = api.query_flight.stats()
+        executions = after['executions'] - before['executions']
+        requests = len(statuses)
+        print(f"{label:<11} requests={requests} ok={statuses.count(200)} queries={executions} "
+              f"saved={requests - executions} elapsed={elapsed * 1000:.1f} ms "
+              f"p50={latencies[len(latencies) // 2] * 1000:.1f} ms p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+
+    api.limiter.enabled = True
+    polls = api.RATE_LIMIT_BURST * 5
+    rejected = await runaway_poller(client, polls)
+    print(f"runaway    requests={polls} rejected={rejected} (burst={api.RATE_LIMIT_BURST}, rate={api.RATE_LIMIT_PER_SECOND}/s)")
+
+if __name__ == '__main__':
+    asyncio.run(main())
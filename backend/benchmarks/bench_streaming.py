@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import json
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Make the backend package importable when run as a script, as run.py does
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+sys.path.append(str(backend_dir / 'src'))
+
+import aiosqlite
+from src.services.streaming import fetch_chunks, encode_array, compress, GzipEncoder
+
+QUERY = 'SELECT * FROM historical_data ORDER BY id'
+
+# Builds a throwaway database with `rows` historical bars spread over 1,000 symbols
+def build_database(path, rows):
+    db = sqlite3.connect(path)
+    db.execute('''
+        CREATE TABLE historical_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            stock_symbol TEXT NOT NULL,
+            date DATE NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            volume INTEGER NOT NULL
+        )
+    ''')
+    db.executemany(
+        'INSERT INTO historical_data (stock_symbol, date, open, high, low, close, volume) VALUES (?, ?, ?, ?, ?, ?, ?)',
+        ((f'SYM{i % 1000}', f'2020-01-{i % 28 + 1:02d}', 100.0 + i % 7, 101.0, 99.0, 100.5, 1000000 + i) for i in range(rows))
+    )
+    db.commit()
+    db.close()
+
+# The previous handler shape: fetchall, list of dicts, one json.dumps of the whole body
+async def run_buffered(path):
+    async with aiosqlite.connect(path) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(QUERY)
+        rows = await cursor.fetchall()
+        body = json.dumps([dict(row) for row in rows]).encode('utf-8')
+        return len(body)
+
+async def run_streaming(path, gzip, first_byte):
+    body = encode_array(fetch_chunks(QUERY, db_path=path))
+    if gzip:
+        body = compress(body, GzipEncoder())
+    size = 0
+    async for data in body:
+        if not first_byte:
+            first_byte.append(time.perf_counter())
+        size += len(data)
+    return size
+
+def measure(label, coro_factory):
+    first_byte = []
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = asyncio.run(coro_factory(first_byte))
+    end = time.perf_counter()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    ttfb = (first_byte[0] if first_byte else end) - start
+    print(f"{label:<18} ttfb={ttfb * 1000:9.1f} ms  total={(end - start) * 1000:9.1f} ms  "
+          f"peak={peak / 1024 / 1024:8.1f} MiB  body={size / 1024 / 1024:8.1f} MiB")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare buffered and streamed JSON list responses")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'bench.db'
+        print(f"Building {args.rows:,} rows...")
+        build_database(path, args.rows)
+
+        # Buffered responses only produce their first byte once the whole body exists
+        measure('buffered json', lambda first_byte: run_buffered(path))
+        measure('stream json', lambda first_byte: run_streaming(path, False, first_byte))
+        measure('stream json+gzip', lambda first_byte: run_streaming(path, True, first_byte))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,321 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+# Make the backend package importable when run as a script, as run.py does
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+sys.path.append(str(backend_dir / 'src'))
+
+import aiosqlite
+import jwt
+from src.database.database import DATABASE_PATH, init_db
+from src.database.partitions import select_bars
+# app.py registers the blueprint imported as routes.api, so patch that module instance
+from routes import api
+
+STOCK_STATE_COLUMNS = ('price', 'change', 'change_percent', 'volume', 'high', 'low', 'open', 'updated_at')
+
+# Market replay: bars are expanded into intrabar ticks (O, L/H, H/L, C) and pushed
+# through POST /api/stocks/quotes at `speed` times real time while readers poll
+# /stocks/latest and /portfolio. Each tick of the tracked symbol is timestamped at
+# ingest, and the first poll that shows its price gives the end-to-end latency.
+#
+# In process the rate limiter is switched off. Against --base-url it stays on, so
+# every reader polls with its own token at most --client-rate times a second and
+# the writer rotates over as many tokens as its tick rate needs. Requests the
+# server still rejects with 429 are counted apart and kept out of the latencies.
+
+class InProcessTransport:
+    def __init__(self):
+        from src.app import app
+        self.client = app.test_client()
+
+    async def request(self, method, path, token, body=None):
+        response = await self.client.open(
+            path, method=method, headers={'Authorization': f'Bearer {token}'}, json=body
+        )
+        return response.status_code, await response.get_json()
+
+class HttpTransport:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    async def request(self, method, path, token, body=None):
+        return await asyncio.to_thread(self._send, method, path, token, body)
+
+    def _send(self, method, path, token, body):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method, headers={
+            'Authorization': f'Bearer {token}', 'Content-Type': 'application/json',
+        })
+        try:
+            with urllib.request.urlopen(req, timeout=30) as response:
+                return response.status, json.loads(response.read() or b'null')
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+def token_for(name):
+    return jwt.encode({'email': f'{name}@replay.local', 'name': name}, api.SECRET_KEY, algorithm='HS256')
+
+async def load_recorded_bars(symbols, bars):
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        rows = await select_bars(db, ('date', 'stock_symbol', 'open', 'high', 'low', 'close', 'volume'), symbols, order_by='date')
+    by_date = {}
+    for date, symbol, *values in rows:
+        by_date.setdefault(date, {})[symbol] = values
+    return [by_date[date] for date in sorted(by_date)][-bars:]
+
+async def load_generated_bars(symbols, bars, seed):
+    # Random walk from the current quotes, 0.2% volatility per bar
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        cursor = await db.execute(
+            f"SELECT symbol, price FROM stocks WHERE symbol IN ({','.join('?' * len(symbols))})", symbols
+        )
+        prices = {symbol: price or 100.0 for symbol, price in await cursor.fetchall()}
+    rng = random.Random(seed)
+    frames = []
+    for _ in range(bars):
+        frame = {}
+        for symbol, price in prices.items():
+            close = price * (1 + rng.gauss(0, 0.002))
+            high = max(price, close) * (1 + abs(rng.gauss(0, 0.001)))
+            low = min(price, close) * (1 - abs(rng.gauss(0, 0.001)))
+            frame[symbol] = [price, high, low, close, rng.randint(1000, 100000)]
+            prices[symbol] = close
+        frames.append(frame)
+    return frames
+
+def expand_ticks(frames, ticks_per_bar):
+    # Up bars trade open -> low -> high -> close, down bars open -> high -> low -> close
+    for frame in frames:
+        paths = {}
+        for symbol, (open_, high, low, close, volume) in frame.items():
+            path = [open_, low, high, close] if close >= open_ else [open_, high, low, close]
+            paths[symbol] = (path[:ticks_per_bar - 1] + path[-1:], open_, int(volume) // ticks_per_bar)
+        for step in range(ticks_per_bar):
+            yield [
+                {"symbol": symbol, "price": round(path[step], 4), "open": open_, "volume": volume}
+                for symbol, (path, open_, volume) in paths.items()
+            ]
+
+class VisibilityTracker:
+    def __init__(self, endpoints):
+        self.pending = {endpoint: [] for endpoint in endpoints}
+        self.latencies = {endpoint: [] for endpoint in endpoints}
+        self.superseded = {endpoint: 0 for endpoint in endpoints}
+        self.last_price = None
+
+    def ingest(self, price, sent_at):
+        # Repeated prices cannot be told apart, so only price changes are tracked
+        if price == self.last_price:
+            return
+        self.last_price = price
+        for pending in self.pending.values():
+            pending.append((price, sent_at))
+
+    def retract(self, price, sent_at):
+        # The server refused the tick, so it can never become visible
+        for pending in self.pending.values():
+            if (price, sent_at) in pending:
+                pending.remove((price, sent_at))
+        if price == self.last_price:
+            self.last_price = None
+
+    def observe(self, endpoint, price, seen_at):
+        pending = self.pending[endpoint]
+        for i in range(len(pending) - 1, -1, -1):
+            if pending[i][0] == price:
+                self.latencies[endpoint].append(seen_at - pending[i][1])
+                # Older ticks were overwritten before any poll caught them
+                self.superseded[endpoint] += i
+                del pending[:i + 1]
+                return
+
+def tracked_price(endpoint, payload, symbol):
+    if endpoint == 'portfolio':
+        rows = (payload or {}).get('holdings', []) if isinstance(payload, dict) else []
+    else:
+        rows = payload or []
+    for row in rows:
+        if row.get('symbol') == symbol:
+            return row.get('price')
+    return None
+
+def percentile(values, q):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+def count_error(stats, status):
+    if status == 429:
+        stats['throttled'] += 1
+    else:
+        stats['errors'][status] = stats['errors'].get(status, 0) + 1
+
+async def writer(transport, ticks, spacing, tracked, tracker, stats, tokens):
+    tokens = [token_for(f'replay-writer-{i}') for i in range(tokens)]
+    start = time.perf_counter()
+    for i, batch in enumerate(ticks):
+        due = start + i * spacing
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            stats['behind'] = max(stats['behind'], -delay)
+
+        sent_at = time.perf_counter()
+        price = next((quote['price'] for quote in batch if quote['symbol'] == tracked), None)
+        if price is not None:
+            tracker.ingest(price, sent_at)
+        status, _ = await transport.request('POST', '/api/stocks/quotes', tokens[i % len(tokens)], {"quotes": batch})
+        if status != 200:
+            count_error(stats, status)
+            if price is not None:
+                tracker.retract(price, sent_at)
+            continue
+        stats['ingest'].append(time.perf_counter() - sent_at)
+        stats['ticks'] += 1
+        stats['quotes'] += len(batch)
+
+async def reader(transport, endpoint, path, tracked, tracker, stats, done, worker, rate=None):
+    token = token_for(f'replay-reader-{worker}')
+    spacing = 1 / rate if rate else 0
+    due = time.perf_counter()
+    while not done.is_set():
+        # Paced readers keep to a fixed schedule, so a slow read does not push later ones back
+        due += spacing
+        start = time.perf_counter()
+        status, payload = await transport.request('GET', path, token)
+        now = time.perf_counter()
+        if status != 200:
+            count_error(stats, status)
+            await asyncio.sleep(max(0.01, due - time.perf_counter()))
+            continue
+        stats['reads'][endpoint].append(now - start)
+        price = tracked_price(endpoint, payload, tracked)
+        if price is not None:
+            tracker.observe(endpoint, price, now)
+        await asyncio.sleep(max(0, due - time.perf_counter()))
+
+async def snapshot_stocks():
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        cursor = await db.execute(f"SELECT {', '.join(STOCK_STATE_COLUMNS)}, symbol FROM stocks")
+        return await cursor.fetchall()
+
+async def restore_stocks(rows):
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        assignments = ', '.join(f'{column} = ?' for column in STOCK_STATE_COLUMNS)
+        await db.executemany(f'UPDATE stocks SET {assignments} WHERE symbol = ?', rows)
+        await db.commit()
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay bars through the quote endpoint and measure read visibility")
+    parser.add_argument('--symbols', nargs='+', help="Defaults to every stock in the stocks table")
+    parser.add_argument('--source', choices=['recorded', 'generated'], default='recorded')
+    parser.add_argument('--bars', type=int, default=100)
+    parser.add_argument('--bar-seconds', type=float, default=None, help="Real duration of one bar (default: 1d recorded, 60s generated)")
+    parser.add_argument('--speed', type=float, default=None, help="Multiple of real time (default: 10 ticks/s)")
+    parser.add_argument('--ticks-per-bar', type=int, choices=[2, 3, 4], default=4)
+    parser.add_argument('--readers', type=int, default=4, help="Concurrent pollers per endpoint")
+    parser.add_argument('--base-url', help="Replay against a running server instead of in process")
+    parser.add_argument('--client-rate', type=float, default=api.RATE_LIMIT_PER_SECOND,
+                        help="Requests per second the server allows each token; paces --base-url workers")
+    parser.add_argument('--keep', action='store_true', help="Leave replayed prices in the stocks table (in process only)")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    await init_db()
+    if args.symbols is None:
+        async with aiosqlite.connect(DATABASE_PATH) as db:
+            cursor = await db.execute('SELECT symbol FROM stocks ORDER BY symbol')
+            args.symbols = [row[0] for row in await cursor.fetchall()]
+        if not args.symbols:
+            sys.exit("No stocks to replay; run the seed first")
+
+    if args.source == 'recorded':
+        frames = await load_recorded_bars(args.symbols, args.bars)
+        bar_seconds = args.bar_seconds or 86400
+    else:
+        frames = await load_generated_bars(args.symbols, args.bars, args.seed)
+        bar_seconds = args.bar_seconds or 60
+    if not frames:
+        sys.exit("No bars to replay")
+    ticks = list(expand_ticks(frames, args.ticks_per_bar))
+    speed = args.speed or bar_seconds * 10 / args.ticks_per_bar
+    spacing = bar_seconds / args.ticks_per_bar / speed
+
+    # Portfolio visibility needs a held symbol; fall back to the first replayed one
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        cursor = await db.execute(
+            f"SELECT stock_id FROM portfolio_holdings WHERE stock_id IN ({','.join('?' * len(args.symbols))}) LIMIT 1",
+            args.symbols
+        )
+        held = await cursor.fetchone()
+    tracked = held[0] if held else args.symbols[0]
+
+    if args.base_url:
+        transport = HttpTransport(args.base_url)
+        saved = None
+        # Stay inside the server's per-token budget rather than measuring its 429s
+        read_rate = args.client_rate
+        writer_tokens = max(1, math.ceil(1 / spacing / args.client_rate))
+    else:
+        transport = InProcessTransport()
+        # Every worker shares the process; lift the per-client budget as the herd benchmark does
+        api.limiter.enabled = False
+        saved = None if args.keep else await snapshot_stocks()
+        read_rate, writer_tokens = None, 1
+
+    endpoints = {'latest': '/api/stocks/latest', 'portfolio': '/api/portfolio'}
+    tracker = VisibilityTracker(endpoints)
+    stats = {'ticks': 0, 'quotes': 0, 'behind': 0.0, 'ingest': [], 'errors': {}, 'throttled': 0,
+             'reads': {endpoint: [] for endpoint in endpoints}}
+    done = asyncio.Event()
+
+    print(f"replaying {len(frames)} bars x {len(args.symbols)} symbols as {len(ticks)} ticks "
+          f"at {speed:g}x ({1 / spacing:.1f} ticks/s), tracking {tracked}")
+    if read_rate:
+        print(f"pacing     readers at {read_rate:g} req/s each, writer over {writer_tokens} token(s)")
+    readers = [
+        asyncio.create_task(reader(transport, endpoint, path, tracked, tracker, stats, done, f'{endpoint}-{i}', read_rate))
+        for endpoint, path in endpoints.items() for i in range(args.readers)
+    ]
+    start = time.perf_counter()
+    try:
+        await writer(transport, ticks, spacing, tracked, tracker, stats, writer_tokens)
+        # Give the pollers a moment to see the final tick
+        await asyncio.sleep(min(1.0, spacing * 4))
+    finally:
+        done.set()
+        await asyncio.gather(*readers)
+        if saved is not None:
+            await restore_stocks(saved)
+    elapsed = time.perf_counter() - start
+
+    ingest = stats['ingest']
+    print(f"ingest     ticks={stats['ticks']} quotes={stats['quotes']} rate={stats['ticks'] / elapsed:.1f} ticks/s "
+          f"p50={percentile(ingest, 0.5) * 1000:.2f} ms p99={percentile(ingest, 0.99) * 1000:.2f} ms "
+          f"max_behind_schedule={stats['behind'] * 1000:.1f} ms")
+    for endpoint in endpoints:
+        seen = tracker.latencies[endpoint]
+        reads = stats['reads'][endpoint]
+        print(f"{endpoint:<10} reads={len(reads)} read_p50={percentile(reads, 0.5) * 1000:.2f} ms "
+              f"visible={len(seen)} superseded={tracker.superseded[endpoint]} "
+              f"p50={percentile(seen, 0.5) * 1000:.2f} ms p95={percentile(seen, 0.95) * 1000:.2f} ms "
+              f"p99={percentile(seen, 0.99) * 1000:.2f} ms")
+    if stats['throttled']:
+        print(f"throttled  {stats['throttled']} requests rejected with 429 (not in the latencies)")
+    if stats['errors']:
+        print(f"errors     {stats['errors']}")
+
+if __name__ == '__main__':
+    asyncio.run(main())
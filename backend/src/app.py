@@ -2,8 +2,11 @@ import sys
 from quart import Quart, jsonify
 from quart_cors import cors
 from routes.api import bp as api_bp
+from json_provider import OrjsonProvider
+from src.database.replica import replica
 
 app = Quart(__name__)
+app.json = OrjsonProvider(app)
 
 # Allow requests from development and production frontend ports
 ALLOWED_ORIGINS = [
@@ -13,11 +16,21 @@ ALLOWED_ORIGINS = [
     "http://127.0.0.1:8080"
 ]
 
-app = cors(app, allow_origin=ALLOWED_ORIGINS)
+# The paging cursor travels in a response header the browser must be allowed to read
+app = cors(app, allow_origin=ALLOWED_ORIGINS, expose_headers=["X-Next-After"])
 
 # Register blueprints
 app.register_blueprint(api_bp, url_prefix='/api')
 
+# Analytical reads are served from a periodically refreshed snapshot of the database
+@app.before_serving
+async def start_replica():
+    replica.start()
+
+@app.after_serving
+async def stop_replica():
+    await replica.stop()
+
 @app.route('/')
 async def root():
     return jsonify({"message": "Welcome to HedgeX API"})
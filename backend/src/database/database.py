@@ -1,11 +1,19 @@
 import aiosqlite
 from pathlib import Path
+from src.database.partitions import ensure_partitions
 
 CURRENT_DIR = Path(__file__).parent
 DATABASE_PATH = CURRENT_DIR / "hedgex.db"
+PRICE_STORE_PATH = CURRENT_DIR / "price_store"
+REPLICA_PATH = CURRENT_DIR / "hedgex_replica.db"
 
 async def init_db():
     async with aiosqlite.connect(DATABASE_PATH) as db:
+        # Only takes effect on a new database; lets retention hand pages back without a full VACUUM
+        await db.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        # Persistent; readers (and the replica backup) no longer block writers
+        await db.execute('PRAGMA journal_mode = WAL')
+        
         # Create users table
         await db.execute('''
             CREATE TABLE IF NOT EXISTS users (
@@ -60,19 +68,8 @@ async def init_db():
             )
         ''')
 
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS historical_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                stock_symbol TEXT NOT NULL,
-                date DATE NOT NULL,
-                open REAL NOT NULL,
-                high REAL NOT NULL,
-                low REAL NOT NULL,
-                close REAL NOT NULL,
-                volume INTEGER NOT NULL,
-                FOREIGN KEY (stock_symbol) REFERENCES stocks (symbol)
-            )
-        ''')
+        # historical_data is a view over yearly partitions keyed on (stock_symbol, date)
+        await ensure_partitions(db)
         
         await db.execute('''
             CREATE TABLE IF NOT EXISTS watchlists (
@@ -93,4 +90,83 @@ async def init_db():
             )
         ''')
         
-        await db.commit()
\ No newline at end of file
+        await create_watchlist_index(db)
+        
+        # metric is 'price' or 'change_percent', direction 'above' or 'below'; alerts fire once
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS alerts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_email TEXT NOT NULL,
+                stock_symbol TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                direction TEXT NOT NULL,
+                threshold REAL NOT NULL,
+                status TEXT NOT NULL DEFAULT 'active',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                triggered_at TIMESTAMP,
+                trigger_price REAL
+            )
+        ''')
+        
+        await db.execute('''
+            CREATE INDEX IF NOT EXISTS idx_alerts_user
+            ON alerts (user_email, id)
+        ''')
+        
+        await create_search_index(db)
+
+        await db.commit()
+
+# A symbol appears once per watchlist, which also makes the index a unique keyset
+# cursor for paging in symbol order. Duplicates from before are dropped first.
+async def create_watchlist_index(db):
+    cursor = await db.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_watchlist_items_unique'")
+    if await cursor.fetchone():
+        return
+
+    await db.execute('''
+        DELETE FROM watchlist_items WHERE id NOT IN (
+            SELECT MIN(id) FROM watchlist_items GROUP BY watchlist_id, stock_symbol
+        )
+    ''')
+    await db.execute('DROP INDEX IF EXISTS idx_watchlist_items_watchlist')
+    await db.execute('''
+        CREATE UNIQUE INDEX idx_watchlist_items_unique
+        ON watchlist_items (watchlist_id, stock_symbol)
+    ''')
+
+# Trigram FTS5 table kept in sync with stocks by triggers; used for fuzzy symbol search
+async def create_search_index(db):
+    cursor = await db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stocks_fts'")
+    if await cursor.fetchone():
+        return
+
+    try:
+        await db.execute('''
+            CREATE VIRTUAL TABLE stocks_fts USING fts5(
+                symbol, name,
+                content='stocks', content_rowid='id', tokenize='trigram'
+            )
+        ''')
+    except aiosqlite.OperationalError:
+        # FTS5 or the trigram tokenizer is not compiled in; search falls back to prefix matching only
+        return
+
+    await db.execute('''
+        CREATE TRIGGER IF NOT EXISTS stocks_fts_insert AFTER INSERT ON stocks BEGIN
+            INSERT INTO stocks_fts (rowid, symbol, name) VALUES (new.id, new.symbol, new.name);
+        END
+    ''')
+    await db.execute('''
+        CREATE TRIGGER IF NOT EXISTS stocks_fts_delete AFTER DELETE ON stocks BEGIN
+            INSERT INTO stocks_fts (stocks_fts, rowid, symbol, name) VALUES ('delete', old.id, old.symbol, old.name);
+        END
+    ''')
+    await db.execute('''
+        CREATE TRIGGER IF NOT EXISTS stocks_fts_update AFTER UPDATE OF symbol, name ON stocks BEGIN
+            INSERT INTO stocks_fts (stocks_fts, rowid, symbol, name) VALUES ('delete', old.id, old.symbol, old.name);
+            INSERT INTO stocks_fts (rowid, symbol, name) VALUES (new.id, new.symbol, new.name);
+        END
+    ''')
+    # Index rows that existed before the table was created
+    await db.execute("INSERT INTO stocks_fts (stocks_fts) VALUES ('rebuild')")
\ No newline at end of file
@@ -7,6 +7,7 @@ from pathlib import Path
 
 # Import from the local database module
 from src.database.database import DATABASE_PATH
+from src.database.partitions import upsert_bars
 
 # Sample data for initialization
 SAMPLE_STOCKS = [
@@ -257,16 +258,14 @@ async def init_sample_data():
             
             if count[0] == 0:  # Only insert if no data exists
                 historical_data = generate_historical_data(symbol)
-                for data_point in historical_data:
-                    await db.execute('''
-                        INSERT INTO historical_data 
-                        (stock_symbol, date, open, high, low, close, volume)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        symbol, data_point["date"], data_point["open"], 
-                        data_point["high"], data_point["low"], data_point["close"], 
+                await upsert_bars(db, [
+                    (
+                        symbol, data_point["date"], data_point["open"],
+                        data_point["high"], data_point["low"], data_point["close"],
                         data_point["volume"]
-                    ))
+                    )
+                    for data_point in historical_data
+                ])
         
         await db.commit()
         print("Sample data initialized successfully!")
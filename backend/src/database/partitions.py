@@ -0,0 +1,424 @@
+import argparse
+import asyncio
+import logging
+import re
+import uuid
+from datetime import datetime
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+# historical_data is split into one WITHOUT ROWID table per calendar year, clustered
+# on (stock_symbol, date) so a symbol's bars for a range sit next to each other on
+# disk and re-inserting a bar replaces it. `historical_data` itself is a UNION ALL
+# view over the partitions for readers that do not go through the router.
+
+PARTITION_PREFIX = 'historical_data_'
+PARTITION_PATTERN = re.compile(r'^historical_data_(\d{4})$')
+BAR_COLUMNS = ('stock_symbol', 'date', 'open', 'high', 'low', 'close', 'volume')
+IN_CHUNK = 500
+# SQLite's historical SQLITE_MAX_VARIABLE_NUMBER; builds before 3.32 reject more
+MAX_QUERY_PARAMS = 999
+VACUUM_STEP_PAGES = 1000
+
+def partition_name(year):
+    return f'{PARTITION_PREFIX}{int(year):04d}'
+
+def partition_year(date):
+    return str(date)[:4]
+
+async def list_partitions(db):
+    cursor = await db.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'historical_data_%'"
+    )
+    years = [PARTITION_PATTERN.match(row[0]) for row in await cursor.fetchall()]
+    return sorted(match.group(1) for match in years if match)
+
+async def create_partition(db, year):
+    await _create_bar_table(db, partition_name(year))
+
+async def _create_bar_table(db, name):
+    await db.execute(f'''
+        CREATE TABLE IF NOT EXISTS {name} (
+            stock_symbol TEXT NOT NULL,
+            date DATE NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            volume INTEGER NOT NULL,
+            PRIMARY KEY (stock_symbol, date)
+        ) WITHOUT ROWID
+    ''')
+
+async def rebuild_view(db):
+    years = await list_partitions(db)
+    if not years:
+        years = [str(datetime.now().year)]
+        await create_partition(db, years[0])
+
+    columns = ', '.join(BAR_COLUMNS)
+    union = ' UNION ALL '.join(f'SELECT {columns} FROM {partition_name(year)}' for year in years)
+    await db.execute('DROP VIEW IF EXISTS historical_data')
+    await db.execute(f'CREATE VIEW historical_data AS {union}')
+
+# Moves a pre-partitioning historical_data table into yearly partitions. Later rows
+# win on duplicate (symbol, date), which is what INSERT OR REPLACE in seed.py meant.
+async def migrate_legacy_table(db):
+    cursor = await db.execute("SELECT type FROM sqlite_master WHERE name = 'historical_data'")
+    row = await cursor.fetchone()
+    if row is None or row[0] != 'table':
+        return False
+
+    cursor = await db.execute('SELECT DISTINCT substr(date, 1, 4) FROM historical_data')
+    years = [year for year, in await cursor.fetchall() if year]
+    columns = ', '.join(BAR_COLUMNS)
+    for year in years:
+        await create_partition(db, year)
+        await db.execute(f'''
+            INSERT OR REPLACE INTO {partition_name(year)} ({columns})
+            SELECT {columns} FROM historical_data
+            WHERE date >= ? AND date < ?
+            ORDER BY id
+        ''', (f'{year}-01-01', f'{int(year) + 1:04d}-01-01'))
+    await db.execute('DROP TABLE historical_data')
+    logger.info(f"Migrated historical_data into {len(years)} yearly partitions")
+    return True
+
+async def ensure_partitions(db):
+    await migrate_legacy_table(db)
+    await rebuild_view(db)
+    await ensure_catalog(db)
+
+# Routes bars to their yearly partition; (symbol, date) is the key, so rewriting a bar replaces it
+async def upsert_bars(db, rows):
+    by_year = {}
+    for row in rows:
+        by_year.setdefault(partition_year(row[1]), []).append(row)
+    if not by_year:
+        return 0
+
+    existing = set(await list_partitions(db))
+    created = False
+    columns = ', '.join(BAR_COLUMNS)
+    for year, year_rows in by_year.items():
+        if year not in existing:
+            await create_partition(db, year)
+            created = True
+        await db.executemany(
+            f'INSERT OR REPLACE INTO {partition_name(year)} ({columns}) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            year_rows
+        )
+    if created:
+        await rebuild_view(db)
+
+    # A written bar can only move its symbol's last date forward
+    last_dates = {}
+    for row in rows:
+        symbol, date = row[0], str(row[1])
+        if symbol not in last_dates or date > last_dates[symbol]:
+            last_dates[symbol] = date
+    version = await _next_version(db)
+    await db.executemany('''
+        INSERT INTO bar_symbols (stock_symbol, last_date, version) VALUES (?, ?, ?)
+        ON CONFLICT (stock_symbol) DO UPDATE SET
+            last_date = CASE WHEN last_date IS NULL OR excluded.last_date > last_date
+                             THEN excluded.last_date ELSE last_date END,
+            version = excluded.version
+    ''', [(symbol, date, version) for symbol, date in last_dates.items()])
+    return sum(len(year_rows) for year_rows in by_year.values())
+
+async def delete_bars(db, symbol, start, end):
+    years = await list_partitions(db)
+    for year in years:
+        if partition_year(start) <= year <= partition_year(end):
+            await db.execute(
+                f'DELETE FROM {partition_name(year)} WHERE stock_symbol = ? AND date BETWEEN ? AND ?',
+                (symbol, str(start), str(end))
+            )
+    await refresh_catalog(db, [symbol])
+
+# Per-symbol last bar dates, kept current by every write in this module so readers
+# never scan partitions to judge freshness. Each write transaction bumps
+# bar_version.version and stamps it on the symbols it touched; the epoch is fixed
+# when the catalog is created, so state cached against another database file is
+# never mistaken for current.
+async def ensure_catalog(db):
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS bar_symbols (
+            stock_symbol TEXT PRIMARY KEY,
+            last_date DATE,
+            version INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_bar_symbols_version ON bar_symbols (version)')
+    cursor = await db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'bar_version'")
+    if await cursor.fetchone():
+        return
+
+    await db.execute('''
+        CREATE TABLE bar_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            epoch TEXT NOT NULL,
+            version INTEGER NOT NULL
+        )
+    ''')
+    await db.execute('INSERT INTO bar_version (id, epoch, version) VALUES (1, ?, 0)', (uuid.uuid4().hex,))
+    # Bars written before the catalog existed
+    await refresh_catalog(db)
+
+async def _next_version(db):
+    await db.execute('UPDATE bar_version SET version = version + 1')
+    cursor = await db.execute('SELECT version FROM bar_version')
+    return (await cursor.fetchone())[0]
+
+# (epoch, version) of the last committed bar write
+async def bars_version(db):
+    cursor = await db.execute('SELECT epoch, version FROM bar_version')
+    return await cursor.fetchone()
+
+# Recomputes catalog rows from the partitions, for writes that can move a last date
+# backwards (deletes, dropped or compacted partitions). Only rows that change are stamped.
+async def refresh_catalog(db, symbols=None):
+    scanned = await scan_last_dates(db, symbols)
+    if symbols is None:
+        cursor = await db.execute('SELECT stock_symbol, last_date FROM bar_symbols')
+        current = dict(await cursor.fetchall())
+        targets = set(current) | set(scanned)
+    else:
+        current = await _catalog_rows(db, symbols, include_empty=True)
+        targets = set(symbols)
+    changed = [
+        (symbol, scanned.get(symbol)) for symbol in targets
+        if (symbol in current and current[symbol] != scanned.get(symbol)) or (symbol not in current and symbol in scanned)
+    ]
+    if not changed:
+        return 0
+
+    version = await _next_version(db)
+    await db.executemany('''
+        INSERT INTO bar_symbols (stock_symbol, last_date, version) VALUES (?, ?, ?)
+        ON CONFLICT (stock_symbol) DO UPDATE SET last_date = excluded.last_date, version = excluded.version
+    ''', [(symbol, last_date, version) for symbol, last_date in changed])
+    return len(changed)
+
+async def _catalog_rows(db, symbols, include_empty=False):
+    symbols = list(symbols)
+    rows = {}
+    for i in range(0, len(symbols), IN_CHUNK):
+        chunk = symbols[i:i + IN_CHUNK]
+        cursor = await db.execute(
+            f"SELECT stock_symbol, last_date FROM bar_symbols WHERE stock_symbol IN ({','.join('?' * len(chunk))})"
+            + ('' if include_empty else ' AND last_date IS NOT NULL'),
+            chunk
+        )
+        rows.update(await cursor.fetchall())
+    return rows
+
+# Last bar date of each of `symbols` that has bars, from the catalog's primary key
+async def latest_dates(db, symbols):
+    return await _catalog_rows(db, symbols)
+
+# Latest bar date across `symbols`
+async def latest_date(db, symbols):
+    return max((await latest_dates(db, symbols)).values(), default=None)
+
+# Symbols whose catalog row changed in a write after `version`; last_date is None
+# for a symbol that lost all of its bars
+async def changed_since(db, version):
+    cursor = await db.execute('SELECT stock_symbol, last_date FROM bar_symbols WHERE version > ?', (version,))
+    return dict(await cursor.fetchall())
+
+# Last bar dates straight from the partitions, newest first; a symbol found in a
+# partition is settled there, so only symbols without recent bars reach older years
+async def scan_last_dates(db, symbols=None):
+    years = await list_partitions(db)
+    last_dates = {}
+    if symbols is None:
+        for year in years:
+            cursor = await db.execute(f'SELECT stock_symbol, MAX(date) FROM {partition_name(year)} GROUP BY stock_symbol')
+            last_dates.update(await cursor.fetchall())
+        return last_dates
+
+    remaining = list(symbols)
+    for year in reversed(years):
+        if not remaining:
+            break
+        for i in range(0, len(remaining), IN_CHUNK):
+            chunk = remaining[i:i + IN_CHUNK]
+            cursor = await db.execute(
+                f"SELECT stock_symbol, MAX(date) FROM {partition_name(year)} "
+                f"WHERE stock_symbol IN ({','.join('?' * len(chunk))}) GROUP BY stock_symbol",
+                chunk
+            )
+            last_dates.update(await cursor.fetchall())
+        remaining = [symbol for symbol in remaining if symbol not in last_dates]
+    return last_dates
+
+# Last bar date of every symbol that has bars, from the catalog
+async def symbol_last_dates(db):
+    cursor = await db.execute('SELECT stock_symbol, last_date FROM bar_symbols WHERE last_date IS NOT NULL')
+    return dict(await cursor.fetchall())
+
+def select_partitions(years, start=None, end=None, after=None):
+    lows = [partition_year(bound) for bound in (start, after) if bound is not None]
+    return [
+        year for year in years
+        if (not lows or year >= max(lows)) and (end is None or year <= partition_year(end))
+    ]
+
+# Query router: one SELECT per partition overlapping [start, end] (or (after, end]),
+# each served by the partition's clustered key, glued with UNION ALL. Every
+# partition repeats the symbol list, so callers must keep symbols x partitions
+# under MAX_QUERY_PARAMS; select_bars sizes its chunks to fit.
+def build_range_query(years, columns, symbols, start=None, end=None, after=None, order_by='stock_symbol, date', limit=None):
+    selected = select_partitions(years, start, end, after)
+    if not selected or not symbols:
+        return None, None
+
+    placeholders = ','.join('?' * len(symbols))
+    conditions = [f'stock_symbol IN ({placeholders})']
+    bounds = []
+    # Only the tighter lower bound is kept: SQLite seeks the key on one of them and
+    # would otherwise walk every row from `start` to `after` testing the other
+    if after is not None and start is not None and str(after) >= str(start):
+        start = None
+    elif after is not None and start is not None:
+        after = None
+    if start is not None:
+        conditions.append('date >= ?')
+        bounds.append(str(start))
+    if after is not None:
+        conditions.append('date > ?')
+        bounds.append(str(after))
+    if end is not None:
+        conditions.append('date <= ?')
+        bounds.append(str(end))
+
+    where = ' AND '.join(conditions)
+    column_list = ', '.join(columns)
+    parts = [f'SELECT {column_list} FROM {partition_name(year)} WHERE {where}' for year in selected]
+    params = (list(symbols) + bounds) * len(selected)
+    query = ' UNION ALL '.join(parts)
+    if order_by:
+        query += f' ORDER BY {order_by}'
+    if limit is not None:
+        query += ' LIMIT ?'
+        params.append(limit)
+    if len(params) > MAX_QUERY_PARAMS:
+        raise ValueError(f"Range query needs {len(params)} parameters, over the limit of {MAX_QUERY_PARAMS}")
+    return query, params
+
+async def select_bars(db, columns, symbols, start=None, end=None, after=None, order_by='stock_symbol, date'):
+    years = await list_partitions(db)
+    partitions = len(select_partitions(years, start, end, after))
+    if not partitions:
+        return []
+    # Each partition takes the chunk plus up to three date bounds
+    chunk_size = max(1, min(IN_CHUNK, MAX_QUERY_PARAMS // partitions - 3))
+    symbols = list(symbols)
+    rows = []
+    for i in range(0, len(symbols), chunk_size):
+        query, params = build_range_query(years, columns, symbols[i:i + chunk_size], start, end, after, order_by)
+        if query is None:
+            continue
+        cursor = await db.execute(query, params)
+        rows.extend(await cursor.fetchall())
+    return rows
+
+# Rolls an intraday partition up to one bar per symbol per day. The rollup is built
+# beside the partition and swapped in inside one transaction, so readers see either
+# the old or the compacted partition. The caller owns the transaction.
+async def compact_partition(db, year):
+    name = partition_name(year)
+    staging = f'{name}_compact'
+    await db.execute(f'DROP TABLE IF EXISTS {staging}')
+    await _create_bar_table(db, staging)
+    await db.execute(f'''
+        INSERT INTO {staging} ({', '.join(BAR_COLUMNS)})
+        SELECT stock_symbol, day, open, high, low, close, volume FROM (
+            SELECT
+                stock_symbol,
+                substr(date, 1, 10) AS day,
+                FIRST_VALUE(open) OVER bars AS open,
+                MAX(high) OVER bars AS high,
+                MIN(low) OVER bars AS low,
+                LAST_VALUE(close) OVER bars AS close,
+                SUM(volume) OVER bars AS volume,
+                ROW_NUMBER() OVER bars AS position
+            FROM {name}
+            WINDOW bars AS (
+                PARTITION BY stock_symbol, substr(date, 1, 10) ORDER BY date
+                ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+            )
+        )
+        WHERE position = 1
+    ''')
+    # The view must go first: SQLite refuses to rename while a view references a missing table
+    await db.execute('DROP VIEW IF EXISTS historical_data')
+    await db.execute(f'DROP TABLE {name}')
+    await db.execute(f'ALTER TABLE {staging} RENAME TO {name}')
+    await rebuild_view(db)
+
+# Returns freed pages to the OS a batch at a time instead of one blocking VACUUM.
+# Only effective when the database uses auto_vacuum=INCREMENTAL; otherwise the
+# freed pages stay on the freelist and are reused by later inserts.
+async def incremental_vacuum(db, step_pages=VACUUM_STEP_PAGES):
+    cursor = await db.execute('PRAGMA auto_vacuum')
+    if (await cursor.fetchone())[0] != 2:
+        return 0
+
+    released = 0
+    while True:
+        cursor = await db.execute('PRAGMA freelist_count')
+        free = (await cursor.fetchone())[0]
+        if free == 0:
+            break
+        await db.execute(f'PRAGMA incremental_vacuum({min(step_pages, free)})')
+        await db.commit()
+        released += min(step_pages, free)
+        await asyncio.sleep(0)  # Let writers in between batches
+    return released
+
+async def apply_retention(db, keep_years, compact_after_years=None, today=None):
+    current = (today or datetime.now()).year
+    years = await list_partitions(db)
+    dropped, compacted = [], []
+
+    # Partition drops, rollups and the view rebuild commit together
+    await db.execute('BEGIN IMMEDIATE')
+    for year in years:
+        age = current - int(year)
+        if age >= keep_years:
+            await db.execute(f'DROP TABLE {partition_name(year)}')
+            dropped.append(year)
+        elif compact_after_years is not None and age >= compact_after_years:
+            # Already daily partitions have nothing to roll up
+            cursor = await db.execute(f'SELECT 1 FROM {partition_name(year)} WHERE length(date) > 10 LIMIT 1')
+            if await cursor.fetchone():
+                await compact_partition(db, year)
+                compacted.append(year)
+
+    if dropped:
+        await rebuild_view(db)
+    if dropped or compacted:
+        await refresh_catalog(db)
+    await db.commit()
+    # No VACUUM: a dropped partition's pages go straight to the freelist
+    released = await incremental_vacuum(db)
+    return {"dropped": dropped, "compacted": compacted, "pages_released": released}
+
+async def main():
+    from src.database.database import DATABASE_PATH
+
+    parser = argparse.ArgumentParser(description="historical_data partition maintenance")
+    parser.add_argument('--keep-years', type=int, default=5, help="Drop partitions at least this many years old")
+    parser.add_argument('--compact-after', type=int, default=None, help="Roll intraday partitions this old up to daily bars")
+    args = parser.parse_args()
+
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        result = await apply_retention(db, args.keep_years, args.compact_after)
+    print(result)
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+import os
+import re
+from pathlib import Path
+import numpy as np
+
+# Append-only columnar bar store: one flat binary file per (symbol, field) under
+# <root>/<interval>/<symbol>/, read back through np.memmap so windows are views
+# into the page cache rather than parsed copies. Kept free of backend imports so
+# the trading bot can use it directly.
+
+FIELDS = {
+    'ts': np.int64,         # bar open time, epoch seconds UTC
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'volume': np.float64,
+}
+VALUE_FIELDS = [field for field in FIELDS if field != 'ts']
+# yfinance-style bar sizes: 1m, 15m, 1h, 1d, 1wk, 1mo
+INTERVAL_PATTERN = re.compile(r'\d+(m|h|d|wk|mo)')
+
+def to_epoch_seconds(values):
+    # Accepts ISO date/datetime strings, datetime64 arrays or pandas DatetimeIndex values
+    array = np.asarray(values)
+    if array.dtype.kind in ('U', 'S', 'O'):
+        array = np.array([str(v).replace(' ', 'T')[:19] for v in array], dtype='datetime64[s]')
+    return array.astype('datetime64[s]').astype(np.int64)
+
+class PriceStore:
+    def __init__(self, root, interval='1d'):
+        if not INTERVAL_PATTERN.fullmatch(interval):
+            raise ValueError(f"Invalid interval for price store: {interval!r}")
+        self.root = Path(root) / interval
+        self.interval = interval
+        self._maps = {}
+
+    def _dir(self, symbol):
+        if not symbol or '/' in symbol or symbol.startswith('.'):
+            raise ValueError(f"Invalid symbol for price store: {symbol!r}")
+        return self.root / symbol
+
+    def _path(self, symbol, field):
+        return self._dir(symbol) / f"{field}.bin"
+
+    def symbols(self):
+        if not self.root.exists():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if (p / 'ts.bin').exists())
+
+    def __len__(self):
+        return len(self.symbols())
+
+    def length(self, symbol):
+        path = self._path(symbol, 'ts')
+        return path.stat().st_size // np.dtype(FIELDS['ts']).itemsize if path.exists() else 0
+
+    def last_ts(self, symbol):
+        columns = self.columns(symbol)
+        return int(columns['ts'][-1]) if columns and len(columns['ts']) else None
+
+    def columns(self, symbol):
+        # ts.bin is written last on append, so its length is the committed row count
+        n = self.length(symbol)
+        if n == 0:
+            return None
+        cached = self._maps.get(symbol)
+        if cached is not None and cached[0] == n:
+            return cached[1]
+
+        columns = {}
+        for field, dtype in FIELDS.items():
+            columns[field] = np.memmap(self._path(symbol, field), dtype=dtype, mode='r', shape=(n,))
+        self._maps[symbol] = (n, columns)
+        return columns
+
+    def window(self, symbol, start=None, end=None, fields=None):
+        # Half-open [start, end) in epoch seconds; the returned arrays are memmap views, not copies
+        columns = self.columns(symbol)
+        if columns is None:
+            return None
+        ts = columns['ts']
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side='left'))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, end, side='left'))
+        return {field: columns[field][lo:hi] for field in (fields or FIELDS)}
+
+    def append(self, symbol, ts, **values):
+        ts = np.asarray(ts, dtype=np.int64)
+        missing = [field for field in VALUE_FIELDS if field not in values]
+        if missing:
+            raise ValueError(f"Missing fields for append: {missing}")
+        if len(ts) == 0:
+            return 0
+        if np.any(np.diff(ts) <= 0):
+            raise ValueError("Timestamps must be strictly increasing")
+
+        directory = self._dir(symbol)
+        directory.mkdir(parents=True, exist_ok=True)
+        n = self.length(symbol)
+
+        # Append-only: anything at or before the last stored bar was already written
+        last = self.last_ts(symbol)
+        keep = slice(None) if last is None else slice(int(np.searchsorted(ts, last, side='right')), None)
+        ts = ts[keep]
+        if len(ts) == 0:
+            return 0
+
+        for field in VALUE_FIELDS:
+            path = self._path(symbol, field)
+            dtype = FIELDS[field]
+            data = np.asarray(values[field], dtype=dtype)[keep]
+            with open(path, 'ab') as f:
+                # Drop a torn tail left by an append that died before ts.bin was written
+                if f.tell() != n * np.dtype(dtype).itemsize:
+                    f.truncate(n * np.dtype(dtype).itemsize)
+                    f.seek(0, os.SEEK_END)
+                f.write(data.tobytes())
+        with open(self._path(symbol, 'ts'), 'ab') as f:
+            f.write(ts.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._maps.pop(symbol, None)
+        return len(ts)
@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import aiosqlite
+import numpy as np
+from src.database.database import DATABASE_PATH, PRICE_STORE_PATH
+from src.database.partitions import delete_bars, select_bars, upsert_bars
+from src.database.price_store import PriceStore, to_epoch_seconds
+
+def _epoch_to_date(ts, interval):
+    values = np.asarray(ts).astype('datetime64[s]')
+    unit = 'D' if interval == '1d' else 's'
+    return [str(v).replace('T', ' ') for v in values.astype(f'datetime64[{unit}]')]
+
+# historical_data -> price store. Incremental: only bars after each symbol's last stored bar are read.
+async def export_to_store(store, symbols=None, db_path=DATABASE_PATH):
+    written = 0
+    async with aiosqlite.connect(db_path) as db:
+        if symbols is None:
+            cursor = await db.execute('SELECT DISTINCT stock_symbol FROM historical_data ORDER BY stock_symbol')
+            symbols = [row[0] for row in await cursor.fetchall()]
+
+        for symbol in symbols:
+            last = store.last_ts(symbol)
+            after = _epoch_to_date([last], store.interval)[0] if last is not None else None
+            rows = await select_bars(
+                db, ('date', 'open', 'high', 'low', 'close', 'volume'), [symbol], after=after, order_by='date'
+            )
+            if not rows:
+                continue
+
+            dates, opens, highs, lows, closes, volumes = zip(*rows)
+            ts, index = np.unique(to_epoch_seconds(dates), return_index=True)
+            written += store.append(
+                symbol, ts,
+                open=np.array(opens)[index], high=np.array(highs)[index], low=np.array(lows)[index],
+                close=np.array(closes)[index], volume=np.array(volumes)[index],
+            )
+    return written
+
+# price store -> historical_data. Each symbol's stored range replaces the matching rows in the table.
+async def import_from_store(store, symbols=None, db_path=DATABASE_PATH):
+    written = 0
+    async with aiosqlite.connect(db_path) as db:
+        for symbol in symbols or store.symbols():
+            window = store.window(symbol)
+            if window is None or len(window['ts']) == 0:
+                continue
+
+            dates = _epoch_to_date(window['ts'], store.interval)
+            await delete_bars(db, symbol, dates[0], dates[-1])
+            written += await upsert_bars(db, list(zip(
+                [symbol] * len(dates), dates,
+                window['open'].tolist(), window['high'].tolist(), window['low'].tolist(),
+                window['close'].tolist(), window['volume'].astype(np.int64).tolist()
+            )))
+        await db.commit()
+    return written
+
+async def main():
+    parser = argparse.ArgumentParser(description="Move bars between historical_data and the columnar price store")
+    parser.add_argument('direction', choices=['export', 'import'], help="export: SQLite -> store, import: store -> SQLite")
+    parser.add_argument('--symbols', nargs='+')
+    parser.add_argument('--interval', default='1d')
+    args = parser.parse_args()
+
+    store = PriceStore(PRICE_STORE_PATH, args.interval)
+    if args.direction == 'export':
+        count = await export_to_store(store, args.symbols)
+    else:
+        count = await import_from_store(store, args.symbols)
+    print(f"{args.direction}: {count} bars written")
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+import aiosqlite
+from src.database.database import DATABASE_PATH, REPLICA_PATH
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL = 30  # seconds between snapshots
+# Older snapshots are not served; reads fall back to the primary
+MAX_LAG_SECONDS = REFRESH_INTERVAL * 4
+BACKUP_PAGES_PER_STEP = 1024
+BACKUP_STEP_SLEEP = 0.01
+
+# Read-only snapshot of hedgex.db for long analytical reads, refreshed with
+# SQLite's online backup API in a worker thread. The copy is written to a temp
+# file and swapped in with os.replace, so readers always open a complete
+# snapshot and connections already open keep the one they started on.
+#
+# With the primary in WAL mode the backup runs as a single read transaction,
+# which never blocks writers. Under a rollback journal it copies in small
+# steps and sleeps between them, so the shared lock is only held briefly.
+class ReplicaManager:
+    def __init__(self, primary=DATABASE_PATH, replica=REPLICA_PATH,
+                 interval=REFRESH_INTERVAL, max_lag=MAX_LAG_SECONDS):
+        self.primary = primary
+        self.replica = replica
+        self.interval = interval
+        self.max_lag = max_lag
+        self._task = None
+        self.refreshed_at = None
+        self.last_duration = None
+        self.last_pages = None
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error = None
+        self.replica_reads = 0
+        self.primary_reads = 0
+
+    def _copy(self):
+        staging = self.replica.with_name(self.replica.name + '.tmp')
+        source = sqlite3.connect(self.primary)
+        target = sqlite3.connect(staging)
+        try:
+            wal = source.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+            if wal:
+                source.backup(target)
+            else:
+                source.backup(target, pages=BACKUP_PAGES_PER_STEP, sleep=BACKUP_STEP_SLEEP)
+            # A plain rollback-journal file opens read-only without -wal/-shm companions
+            target.execute('PRAGMA journal_mode = DELETE')
+            pages = target.execute('PRAGMA page_count').fetchone()[0]
+        finally:
+            target.close()
+            source.close()
+        os.replace(staging, self.replica)
+        return pages
+
+    async def refresh(self):
+        start = time.perf_counter()
+        try:
+            pages = await asyncio.to_thread(self._copy)
+        except (sqlite3.Error, OSError) as e:
+            self.failures += 1
+            self.last_error = str(e)
+            logger.warning(f"Replica refresh failed: {e}")
+            return False
+        self.last_duration = time.perf_counter() - start
+        self.last_pages = pages
+        self.refreshed_at = datetime.now()
+        self.refreshes += 1
+        return True
+
+    async def _run(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def lag_seconds(self):
+        if self.refreshed_at is None:
+            return None
+        return (datetime.now() - self.refreshed_at).total_seconds()
+
+    def is_fresh(self):
+        lag = self.lag_seconds()
+        return lag is not None and lag <= self.max_lag and self.replica.exists()
+
+    def read_path(self):
+        if self.is_fresh():
+            self.replica_reads += 1
+            return self.replica
+        self.primary_reads += 1
+        return self.primary
+
+    # Connection for analytical reads: the snapshot when it is fresh, otherwise the primary
+    def connect(self):
+        path = self.read_path()
+        if path == self.replica:
+            # as_uri() percent-encodes the path, so '?', '#' or '%' in it cannot end up in the query
+            return aiosqlite.connect(f'{Path(path).resolve().as_uri()}?mode=ro', uri=True)
+        return aiosqlite.connect(path)
+
+    def stats(self):
+        lag = self.lag_seconds()
+        return {
+            "fresh": self.is_fresh(),
+            "lag_seconds": round(lag, 3) if lag is not None else None,
+            "refreshed_at": self.refreshed_at.isoformat(sep=' ') if self.refreshed_at else None,
+            "last_refresh_ms": round(self.last_duration * 1000, 1) if self.last_duration is not None else None,
+            "last_refresh_pages": self.last_pages,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+        }
+
+replica = ReplicaManager()
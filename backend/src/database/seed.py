@@ -3,6 +3,7 @@ import asyncio
 import bcrypt
 from datetime import datetime, timedelta
 from .database import DATABASE_PATH, init_db
+from .partitions import upsert_bars
 
 async def seed_database():
     # Initialize database first
@@ -26,10 +27,16 @@ async def seed_database():
             ('META', 'Meta Platforms, Inc.', 472.42, 5.68, 1.21, 15236547, 'Communication Services', 474.80, 468.90, 469.10),
             ('NVDA', 'NVIDIA Corporation', 824.12, 12.34, 1.52, 28563214, 'Technology', 830.56, 815.20, 817.85),
         ]
+        # An upsert keeps the row id; OR REPLACE would delete the row without
+        # firing stocks_fts_delete and leave the FTS index out of sync
         await db.executemany('''
-            INSERT OR REPLACE INTO stocks 
+            INSERT INTO stocks 
             (symbol, name, price, change, change_percent, volume, sector, high, low, open)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(symbol) DO UPDATE SET
+                name = excluded.name, price = excluded.price, change = excluded.change,
+                change_percent = excluded.change_percent, volume = excluded.volume,
+                sector = excluded.sector, high = excluded.high, low = excluded.low, open = excluded.open
         ''', stocks_data)
 
         # Seed portfolio data
@@ -75,11 +82,7 @@ async def seed_database():
                     volume
                 ))
             
-            await db.executemany('''
-                INSERT OR REPLACE INTO historical_data 
-                (stock_symbol, date, open, high, low, close, volume)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', historical_data)
+            await upsert_bars(db, historical_data)
 
         await db.commit()
 
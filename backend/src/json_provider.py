@@ -0,0 +1,11 @@
+import orjson
+from quart.json.provider import DefaultJSONProvider
+
+# orjson-backed provider so every jsonify() call gets the faster encoder.
+# Types orjson cannot handle natively fall back to Quart's default serialiser.
+class OrjsonProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
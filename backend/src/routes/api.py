@@ -1,14 +1,73 @@
-from quart import Blueprint, jsonify, request
+from quart import Blueprint, Response, jsonify, request
+import asyncio
 import aiosqlite
+import orjson
 from datetime import datetime, timedelta
 import jwt
 import bcrypt
-from src.database.database import DATABASE_PATH
+import numpy as np
+from src.database.database import DATABASE_PATH, PRICE_STORE_PATH
+from src.database.partitions import BAR_COLUMNS, build_range_query, list_partitions, symbol_last_dates
+from src.database.replica import replica
+from src.database.price_store import PriceStore, FIELDS as STORE_FIELDS, to_epoch_seconds
+from src.services.search import symbol_index, load_index, fuzzy_search
+from src.services.streaming import fetch_chunks, fetch_rows, iter_chunks, iter_cursor, json_stream_response
+from src.services.coalesce import SingleFlight, RateLimiter
+from src.services.quotes import parse_quotes, apply_quotes
+from src.services.alerts import alert_engine, parse_alert
+from src.services.paging import parse_fields, parse_limit, keyset_clause, page
+from src.services.prices import price_cache, fetch_last_date, load_price_matrix
+from src.services.risk import portfolio_risk, return_stats_cache
+from src.services.equity import equity_cache, fetch_holdings, lttb, period_changes, portfolio_changes
+from src.services import screener
 
 bp = Blueprint('api', __name__)
 
 SECRET_KEY = "your-secret-key-here"  # In production, this should be in environment variables
 
+price_stores = {}
+
+# Columns a client may project with fields=
+STOCK_COLUMNS = (
+    'id', 'symbol', 'name', 'price', 'change', 'change_percent', 'volume',
+    'sector', 'high', 'low', 'open', 'updated_at'
+)
+WATCHLIST_COLUMNS = ('id', 'name', 'created_at')
+BATCH_HISTORICAL_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+MAX_BATCH_SYMBOLS = 200
+ALERT_COLUMNS = (
+    'id', 'stock_symbol', 'metric', 'direction', 'threshold', 'status',
+    'created_at', 'triggered_at', 'trigger_price'
+)
+ALERT_STREAM_HEARTBEAT = 15  # seconds between keep-alive comments on idle streams
+
+# Per-client request budget: sustained requests per second and burst size
+RATE_LIMIT_PER_SECOND = 20
+RATE_LIMIT_BURST = 40
+
+limiter = RateLimiter(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST)
+query_flight = SingleFlight()
+
+# Clients with a valid token are keyed by the identity it carries, everyone else by
+# address, so unverified or rotated tokens cannot mint fresh budgets
+def rate_limit_key(request):
+    auth_header = request.headers.get('Authorization') or ''
+    if auth_header.startswith('Bearer '):
+        try:
+            claims = jwt.decode(auth_header.split(' ')[1], SECRET_KEY, algorithms=['HS256'])
+        except jwt.InvalidTokenError:
+            claims = None
+        if isinstance(claims, dict) and claims.get('email'):
+            return f"user:{claims['email']}"
+    return f"addr:{request.remote_addr}"
+
+@bp.before_request
+async def rate_limit():
+    client = rate_limit_key(request)
+    allowed, retry_after = limiter.allow(client)
+    if not allowed:
+        return jsonify({"error": "Too many requests"}), 429, {'Retry-After': str(max(1, round(retry_after)))}
+
 # Auth middleware
 async def auth_required(request):
     auth_header = request.headers.get('Authorization')
@@ -119,7 +178,14 @@ async def get_portfolio():
         
         result = dict(portfolio)
         result['holdings'] = [dict(holding) for holding in holdings]
-        return jsonify(result)
+        totals = await fetch_holdings(db)
+    
+    # Period changes come from the equity curve of the actual holdings, not the stored figures
+    async with replica.connect() as db:
+        changes = await portfolio_changes(db, totals, result['cash'])
+    if changes is not None:
+        result.update(changes)
+    return jsonify(result)
 
 @bp.route('/portfolio/latest', methods=['GET'])
 async def get_latest_portfolio():
@@ -148,7 +214,14 @@ async def get_latest_portfolio():
         
         result = dict(portfolio)
         result['holdings'] = [dict(holding) for holding in holdings]
-        return jsonify(result)
+        totals = await fetch_holdings(db)
+    
+    # Period changes come from the equity curve of the actual holdings, not the stored figures
+    async with replica.connect() as db:
+        changes = await portfolio_changes(db, totals, result['cash'])
+    if changes is not None:
+        result.update(changes)
+    return jsonify(result)
 
 @bp.route('/portfolio/allocation', methods=['GET'])
 async def get_portfolio_allocation():
@@ -156,7 +229,12 @@ async def get_portfolio_allocation():
     if isinstance(user_data, tuple):
         return user_data
         
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    # Dashboards opening together share one aggregation
+    result = await query_flight.do(('allocation',), compute_allocation)
+    return jsonify(result)
+
+async def compute_allocation():
+    async with replica.connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute('''
             SELECT 
@@ -176,7 +254,81 @@ async def get_portfolio_allocation():
             data['percentage'] = (data['value'] / total_value * 100) if total_value > 0 else 0
             result.append(data)
             
-        return jsonify(result)
+        return result
+
+@bp.route('/portfolio/risk', methods=['GET'])
+async def get_portfolio_risk():
+    user_data = await auth_required(request)
+    if isinstance(user_data, tuple):
+        return user_data
+    
+    confidence = request.args.get('confidence', 0.95, type=float)
+    horizon_days = max(1, request.args.get('horizon', 1, type=int))
+    days = max(30, min(request.args.get('days', 365, type=int), 1825))
+    include_correlation = request.args.get('correlation', 'true').lower() != 'false'
+    if not 0.5 <= confidence < 1:
+        return jsonify({"error": "confidence must be between 0.5 and 1"}), 400
+    
+    async with replica.connect() as db:
+        cursor = await db.execute('''
+            SELECT ph.stock_id, SUM(ph.shares), s.price
+            FROM portfolio_holdings ph
+            JOIN stocks s ON ph.stock_id = s.symbol
+            GROUP BY ph.stock_id
+            ORDER BY ph.stock_id
+        ''')
+        holdings = await cursor.fetchall()
+        if not holdings:
+            return jsonify(None)
+        
+        symbols = [holding[0] for holding in holdings]
+        # Anchor the window on the last stored bar so a stale feed still has a full window
+        last_date = await fetch_last_date(db, symbols)
+        if last_date is None:
+            return jsonify({"error": "Not enough historical data"}), 404
+        start_date = (datetime.strptime(last_date[:10], '%Y-%m-%d') - timedelta(days=days)).date()
+        prices = await price_cache.get(db, symbols, start_date)
+    
+    values = np.array([shares * (price or 0) for _, shares, price in holdings], dtype=float)
+    total_value = values.sum()
+    weights = values / total_value if total_value > 0 else np.zeros_like(values)
+    
+    result = portfolio_risk(
+        symbols, return_stats_cache.get(prices, start_date), weights, total_value,
+        confidence=confidence, horizon_days=horizon_days, include_correlation=include_correlation
+    )
+    if result is None:
+        return jsonify({"error": "Not enough historical data"}), 404
+    result['as_of'] = prices.last_date
+    return jsonify(result)
+
+@bp.route('/portfolio/performance', methods=['GET'])
+async def get_portfolio_performance():
+    user_data = await auth_required(request)
+    if isinstance(user_data, tuple):
+        return user_data
+    
+    start_date = timeframe_start(request.args.get('timeframe', '1Y'), datetime.now()).date()
+    points = request.args.get('points', type=int)
+    
+    async with replica.connect() as db:
+        cursor = await db.execute('SELECT cash FROM portfolio ORDER BY id DESC LIMIT 1')
+        portfolio = await cursor.fetchone()
+        holdings = await fetch_holdings(db)
+        if not portfolio or not holdings:
+            return jsonify(None)
+        curve = await equity_cache.get(db, holdings, portfolio[0], start_date)
+    
+    # Changes use the full window; only the returned series is downsampled
+    changes = period_changes(curve)
+    keep = lttb(curve.values, points) if points else np.arange(len(curve.dates))
+    return jsonify({
+        "dates": curve.dates[keep].tolist(),
+        "values": np.round(curve.values[keep], 2).tolist(),
+        "points": len(curve.dates),
+        "changes": changes,
+        "missing": list(curve.missing),
+    })
 
 @bp.route('/watchlists', methods=['GET'])
 async def get_watchlists():
@@ -184,11 +336,21 @@ async def get_watchlists():
     if isinstance(user_data, tuple):
         return user_data
         
+    try:
+        columns = parse_fields(request.args.get('fields'), WATCHLIST_COLUMNS, 'id')
+        limit = parse_limit(request.args.get('limit'))
+        after = request.args.get('after')
+        if after is not None and not after.isdigit():
+            raise ValueError("after must be a watchlist id")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    tail, params = keyset_clause('id', after, limit)
     async with aiosqlite.connect(DATABASE_PATH) as db:
         db.row_factory = aiosqlite.Row
-        cursor = await db.execute('SELECT * FROM watchlists')
-        watchlists = await cursor.fetchall()
-        return jsonify([dict(watchlist) for watchlist in watchlists])
+        cursor = await db.execute(f"SELECT {', '.join(columns)} FROM watchlists" + tail, params)
+        watchlists, headers = page([dict(watchlist) for watchlist in await cursor.fetchall()], 'id', limit)
+        return jsonify(watchlists), 200, headers
 
 @bp.route('/watchlists', methods=['POST'])
 async def create_watchlist():
@@ -218,7 +380,7 @@ async def add_stock_to_watchlist(watchlist_id):
     
     async with aiosqlite.connect(DATABASE_PATH) as db:
         await db.execute(
-            'INSERT INTO watchlist_items (watchlist_id, stock_symbol) VALUES (?, ?)',
+            'INSERT OR IGNORE INTO watchlist_items (watchlist_id, stock_symbol) VALUES (?, ?)',
             (watchlist_id, symbol)
         )
         await db.commit()
@@ -230,24 +392,41 @@ async def get_watchlist_stocks(watchlist_id):
     if isinstance(user_data, tuple):
         return user_data
         
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute('''
-            SELECT s.* FROM stocks s
-            JOIN watchlist_items wi ON wi.stock_symbol = s.symbol
-            WHERE wi.watchlist_id = ?
-        ''', (watchlist_id,))
-        stocks = await cursor.fetchall()
-        return jsonify([dict(stock) for stock in stocks])
+    try:
+        columns = parse_fields(request.args.get('fields'), STOCK_COLUMNS, 'symbol')
+        limit = parse_limit(request.args.get('limit'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Walks idx_watchlist_items_unique in symbol order; a symbol is listed once per watchlist
+    tail, params = keyset_clause('wi.stock_symbol', request.args.get('after'), limit, has_where=True)
+    query = f'''
+        SELECT {', '.join('s.' + column for column in columns)} FROM watchlist_items wi
+        JOIN stocks s ON s.symbol = wi.stock_symbol
+        WHERE wi.watchlist_id = ?
+    ''' + tail
+    return await paged_response(query, [watchlist_id] + params, 'symbol', limit)
+
+# Unpaged requests keep streaming; a page is bounded by MAX_PAGE_SIZE so it is
+# read in full to find the next cursor before the headers go out
+async def paged_response(query, params, key, limit):
+    if limit is None:
+        return json_stream_response(fetch_chunks(query, params), request)
+    rows, headers = page(await fetch_rows(query, params), key, limit)
+    return json_stream_response(iter_chunks(rows), request, headers)
 
 # Public routes
 @bp.route('/stocks', methods=['GET'])
 async def get_stocks():
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute('SELECT * FROM stocks')
-        stocks = await cursor.fetchall()
-        return jsonify([dict(stock) for stock in stocks])
+    try:
+        columns = parse_fields(request.args.get('fields'), STOCK_COLUMNS, 'symbol')
+        limit = parse_limit(request.args.get('limit'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # symbol is UNIQUE, so its index gives a stable order and an indexed seek to the cursor
+    tail, params = keyset_clause('symbol', request.args.get('after'), limit)
+    return await paged_response(f"SELECT {', '.join(columns)} FROM stocks" + tail, params, 'symbol', limit)
 
 @bp.route('/stocks/latest', methods=['GET'])
 async def get_latest_stocks():
@@ -258,33 +437,336 @@ async def get_latest_stocks():
         stocks = await cursor.fetchall()
         return jsonify([dict(stock) for stock in stocks])
 
-@bp.route('/stocks/<symbol>/historical', methods=['GET'])
-async def get_historical_data(symbol):
-    timeframe = request.args.get('timeframe', '1M')
+@bp.route('/stocks/quotes', methods=['POST'])
+async def update_quotes():
+    user_data = await auth_required(request)
+    if isinstance(user_data, tuple):
+        return user_data
     
-    end_date = datetime.now()
+    data = await request.get_json() or {}
+    try:
+        quotes = parse_quotes(data.get('quotes'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        # Loaded before the update so the engine's last prices are the pre-tick ones
+        await alert_engine.ensure_loaded(db)
+        updated, updated_at = await apply_quotes(db, quotes)
+        triggered = alert_engine.on_quotes(quotes, updated_at)
+        await alert_engine.flush(db)
+    return jsonify({
+        "received": len(quotes), "updated": updated, "triggered": len(triggered),
+        "updated_at": updated_at.isoformat(sep=' ')
+    })
+
+@bp.route('/alerts', methods=['POST'])
+async def create_alert():
+    user_data = await auth_required(request)
+    if isinstance(user_data, tuple):
+        return user_data
+    
+    try:
+        symbol, metric, direction, threshold = parse_alert(await request.get_json())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        await alert_engine.ensure_loaded(db)
+        cursor = await db.execute('''
+            INSERT INTO alerts (user_email, stock_symbol, metric, direction, threshold)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (user_data.get('email'), symbol, metric, direction, threshold))
+        await db.commit()
+    alert_id = cursor.lastrowid
+    alert_engine.add(alert_id, user_data.get('email'), symbol, metric, direction, threshold)
+    return jsonify({
+        "id": alert_id, "stock_symbol": symbol, "metric": metric,
+        "direction": direction, "threshold": threshold, "status": "active"
+    }), 201
+
+@bp.route('/alerts', methods=['GET'])
+async def get_alerts():
+    user_data = await auth_required(request)
+    if isinstance(user_data, tuple):
+        return user_data
+    
+    try:
+        columns = parse_fields(request.args.get('fields'), ALERT_COLUMNS, 'id')
+        limit = parse_limit(request.args.get('limit'))
+        after = request.args.get('after')
+        if after is not None and not after.isdigit():
+            raise ValueError("after must be an alert id")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    query = f"SELECT {', '.join(columns)} FROM alerts WHERE user_email = ?"
+    params = [user_data.get('email')]
+    status = request.args.get('status')
+    if status:
+        query += ' AND status = ?'
+        params.append(status)
+    tail, tail_params = keyset_clause('id', after, limit, has_where=True)
+    return await paged_response(query + tail, params + tail_params, 'id', limit)
+
+@bp.route('/alerts/<int:alert_id>', methods=['DELETE'])
+async def delete_alert(alert_id):
+    user_data = await auth_required(request)
+    if isinstance(user_data, tuple):
+        return user_data
+    
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        cursor = await db.execute(
+            'DELETE FROM alerts WHERE id = ? AND user_email = ?', (alert_id, user_data.get('email'))
+        )
+        await db.commit()
+    if cursor.rowcount == 0:
+        return jsonify({"error": "Alert not found"}), 404
+    alert_engine.remove(alert_id)
+    return jsonify({"message": "Alert deleted"})
+
+# Server-sent events of the caller's triggered alerts. EventSource cannot set
+# headers, so the token may also come as ?token=.
+@bp.route('/alerts/stream', methods=['GET'])
+async def stream_alerts():
+    token = request.args.get('token')
+    if token and not request.headers.get('Authorization'):
+        try:
+            user_data = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
+        except jwt.InvalidTokenError:
+            return jsonify({"error": "Invalid token"}), 401
+    else:
+        user_data = await auth_required(request)
+        if isinstance(user_data, tuple):
+            return user_data
+    
+    email = user_data.get('email')
+    queue = alert_engine.subscribe(email)
+    
+    async def events():
+        try:
+            yield b': connected\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), ALERT_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield b': keep-alive\n\n'
+                    continue
+                yield b'event: alert\ndata: ' + orjson.dumps(event) + b'\n\n'
+        finally:
+            alert_engine.unsubscribe(email, queue)
+    
+    response = Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+    response.timeout = None
+    return response
+
+@bp.route('/stocks/search', methods=['GET'])
+async def search_stocks():
+    query = request.args.get('q', '').strip()
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    fuzzy = request.args.get('fuzzy', 'true').lower() != 'false'
+    
+    if not query:
+        return jsonify([])
+    
+    if not symbol_index.loaded:
+        async with aiosqlite.connect(DATABASE_PATH) as db:
+            await load_index(db)
+    
+    results = symbol_index.search(query, limit)
+    
+    # Only open a connection when the prefix index cannot fill the page
+    if fuzzy and len(results) < limit and len(query) >= 3:
+        seen = {result['symbol'] for result in results}
+        async with aiosqlite.connect(DATABASE_PATH) as db:
+            matches = await fuzzy_search(db, query, limit)
+        for match in matches:
+            if match['symbol'] not in seen:
+                results.append(match)
+                seen.add(match['symbol'])
+                if len(results) == limit:
+                    break
+    
+    return jsonify(results)
+
+def timeframe_start(timeframe, end_date):
     if timeframe == '1D':
-        start_date = end_date - timedelta(days=1)
+        return end_date - timedelta(days=1)
     elif timeframe == '1W':
-        start_date = end_date - timedelta(weeks=1)
+        return end_date - timedelta(weeks=1)
     elif timeframe == '1M':
-        start_date = end_date - timedelta(days=30)
+        return end_date - timedelta(days=30)
     elif timeframe == '6M':
-        start_date = end_date - timedelta(days=180)
+        return end_date - timedelta(days=180)
     elif timeframe == '1Y':
-        start_date = end_date - timedelta(days=365)
+        return end_date - timedelta(days=365)
     else:  # All
-        start_date = end_date - timedelta(days=1825)  # 5 years
+        return end_date - timedelta(days=1825)  # 5 years
+
+# Several symbols in one request, as columns on a shared date axis:
+# {"dates": [...], "symbols": {"AAPL": {"close": [...]}, ...}}. A symbol with no
+# bar on a date gets null there rather than a carried-forward price.
+@bp.route('/stocks/historical', methods=['GET'])
+async def get_batch_historical_data():
+    timeframe = request.args.get('timeframe', '1M')
+    symbols = list(dict.fromkeys(
+        symbol.strip().upper() for symbol in request.args.get('symbols', '').split(',') if symbol.strip()
+    ))
+    if not symbols:
+        return jsonify({"error": "symbols is required"}), 400
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        return jsonify({"error": f"At most {MAX_BATCH_SYMBOLS} symbols per request"}), 400
+    try:
+        fields = parse_fields(request.args.get('fields') or 'close', BATCH_HISTORICAL_FIELDS, 'close')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute('''
-            SELECT * FROM historical_data 
-            WHERE stock_symbol = ? AND date BETWEEN ? AND ?
-            ORDER BY date
-        ''', (symbol, start_date.date(), end_date.date()))
-        data = await cursor.fetchall()
-        return jsonify([dict(point) for point in data])
+    start_date = timeframe_start(timeframe, datetime.now()).date()
+    key = ('historical_batch', tuple(symbols), fields, start_date)
+    matrix = await query_flight.do(key, lambda: fetch_batch_historical(symbols, fields, start_date))
+    
+    present = ~np.isnan(matrix['close']).all(axis=0)
+    return jsonify({
+        "timeframe": timeframe,
+        "dates": matrix.dates.tolist(),
+        "symbols": {
+            symbol: {field: matrix[field][:, i].tolist() for field in fields}
+            for i, symbol in enumerate(matrix.symbols) if present[i]
+        },
+        "missing": [symbol for i, symbol in enumerate(matrix.symbols) if not present[i]],
+    })
+
+async def fetch_batch_historical(symbols, fields, start_date):
+    # Chunked IN queries through the partition router, scattered onto one date axis
+    async with replica.connect() as db:
+        return await load_price_matrix(db, symbols, fields, start_date=start_date, fill=False)
+
+@bp.route('/stocks/<symbol>/historical', methods=['GET'])
+async def get_historical_data(symbol):
+    end_date = datetime.now()
+    start_date = timeframe_start(request.args.get('timeframe', '1M'), end_date)
+    
+    try:
+        columns = parse_fields(request.args.get('fields'), BAR_COLUMNS, 'date')
+        limit = parse_limit(request.args.get('limit'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    after = request.args.get('after')
+    if limit is None:
+        # Unpaged ranges stream off the cursor; sharing them would hold the whole range in memory
+        return json_stream_response(
+            stream_historical_rows(symbol, start_date.date(), end_date.date(), columns, after), request
+        )
+    
+    # Identical concurrent page requests (at most MAX_PAGE_SIZE rows) share one range query
+    params = (symbol, start_date.date(), end_date.date(), columns, after, limit)
+    rows = await query_flight.do(('historical',) + params, lambda: fetch_historical_rows(*params))
+    rows, headers = page(rows, 'date', limit)
+    return json_stream_response(iter_chunks(rows), request, headers)
+
+async def stream_historical_rows(symbol, start_date, end_date, columns=BAR_COLUMNS, after=None, limit=None):
+    # Routed to the yearly partitions overlapping the range; each partition's
+    # (stock_symbol, date) key serves both the cursor seek and the date order.
+    # Partition list and rows share one connection: the read-only snapshot or the primary.
+    async with replica.connect() as db:
+        years = await list_partitions(db)
+        query, params = build_range_query(
+            years, columns, [symbol], start_date, end_date, after=after, order_by='date',
+            limit=limit + 1 if limit is not None else None
+        )
+        if query is None:
+            return
+        async for chunk in iter_cursor(db, query, params):
+            yield chunk
+
+async def fetch_historical_rows(symbol, start_date, end_date, columns=BAR_COLUMNS, after=None, limit=None):
+    rows = []
+    async for chunk in stream_historical_rows(symbol, start_date, end_date, columns, after, limit):
+        rows.extend(chunk)
+    return rows
+
+@bp.route('/screener', methods=['POST'])
+async def run_screener():
+    data = await request.get_json() or {}
+    try:
+        limit = max(1, min(int(data.get('limit', 100)), 1000))
+    except (TypeError, ValueError):
+        return jsonify({"error": "limit must be an integer"}), 400
+    try:
+        criteria = screener.parse_criteria(data.get('criteria'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    async with replica.connect() as db:
+        universe = await symbol_last_dates(db)
+        if not universe:
+            return jsonify({"as_of": None, "universe": 0, "matched": 0, "results": []})
+        
+        # Anchor the window on the latest bar so screening works on stale data too
+        last_date = datetime.strptime(max(universe.values())[:10], '%Y-%m-%d')
+        start_date = (last_date - timedelta(days=screener.LOOKBACK_DAYS)).date()
+        # Symbols with no bar inside the window have nothing to screen
+        symbols = sorted(symbol for symbol, date in universe.items() if date >= str(start_date))
+        matrix = await price_cache.get(db, symbols, start_date, fields=screener.FIELDS)
+    
+    try:
+        result = screener.screen(
+            matrix, criteria, limit=limit,
+            sort_by=data.get('sort'), descending=data.get('order', 'desc') != 'asc'
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    result['as_of'] = matrix.last_date
+    result['universe'] = len(symbols)
+    return jsonify(result)
+
+@bp.route('/stocks/<symbol>/bars', methods=['GET'])
+async def get_stored_bars(symbol):
+    interval = request.args.get('interval', '1d')
+    fields = request.args.get('fields', ','.join(STORE_FIELDS)).split(',')
+    unknown = [field for field in fields if field not in STORE_FIELDS]
+    if unknown:
+        return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+    if 'ts' not in fields:
+        fields.insert(0, 'ts')
+    
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        start = int(to_epoch_seconds([start])[0]) if start else None
+        end = int(to_epoch_seconds([end])[0]) if end else None
+        
+        store = price_stores.get(interval)
+        if store is None:
+            store = PriceStore(PRICE_STORE_PATH, interval)
+            # Only intervals that were actually written are kept around
+            if store.root.is_dir():
+                price_stores[interval] = store
+        window = store.window(symbol, start, end, fields)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    if window is None:
+        return jsonify({"error": f"No stored bars for {symbol}"}), 404
+    
+    # Columnar payload encoded straight from the memory-mapped slices
+    payload = {field: np.asarray(values) for field, values in window.items()}
+    payload['symbol'] = symbol
+    payload['interval'] = interval
+    return Response(orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY), mimetype='application/json')
+
+@bp.route('/metrics', methods=['GET'])
+async def get_metrics():
+    return jsonify({
+        "coalescing": query_flight.stats(),
+        "rate_limit": limiter.stats(),
+        "alerts": alert_engine.stats(),
+        "equity_curves": equity_cache.stats(),
+        "risk_stats": return_stats_cache.stats(),
+        "replica": replica.stats(),
+    })
 
 # Data initialization endpoints
 @bp.route('/stocks/init', methods=['POST'])
@@ -293,23 +775,52 @@ async def initialize_stocks():
         data = await request.get_json()
         stocks = data.get('stocks', [])
         
+        incoming = {stock['symbol']: stock for stock in stocks}
+        
         async with aiosqlite.connect(DATABASE_PATH) as db:
-            # Clear existing stocks
-            await db.execute('DELETE FROM stocks')
+            cursor = await db.execute('SELECT symbol, name, sector FROM stocks')
+            existing = {symbol: (name, sector) for symbol, name, sector in await cursor.fetchall()}
             
-            # Insert new stocks
-            for stock in stocks:
-                await db.execute('''
-                    INSERT INTO stocks 
-                    (symbol, name, price, change, change_percent, volume, sector, high, low, open)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    stock['symbol'], stock['name'], stock['price'], 
-                    stock['change'], stock['changePercent'], stock['volume'],
-                    stock['sector'], stock['high'], stock['low'], stock['open']
-                ))
+            # Only rows that actually change touch the FTS triggers and the prefix index
+            removed = [symbol for symbol in existing if symbol not in incoming]
+            added = [stock for symbol, stock in incoming.items() if symbol not in existing]
+            renamed = [
+                stock for symbol, stock in incoming.items()
+                if symbol in existing and existing[symbol] != (stock['name'], stock['sector'])
+            ]
+            
+            await db.executemany('DELETE FROM stocks WHERE symbol = ?', [(symbol,) for symbol in removed])
+            await db.executemany('''
+                INSERT INTO stocks 
+                (symbol, name, price, change, change_percent, volume, sector, high, low, open)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(
+                stock['symbol'], stock['name'], stock['price'], 
+                stock['change'], stock['changePercent'], stock['volume'],
+                stock['sector'], stock['high'], stock['low'], stock['open']
+            ) for stock in added])
+            await db.executemany(
+                'UPDATE stocks SET name = ?, sector = ? WHERE symbol = ?',
+                [(stock['name'], stock['sector'], stock['symbol']) for stock in renamed]
+            )
+            await db.executemany('''
+                UPDATE stocks SET price = ?, change = ?, change_percent = ?, volume = ?,
+                    high = ?, low = ?, open = ?
+                WHERE symbol = ?
+            ''', [(
+                stock['price'], stock['change'], stock['changePercent'], stock['volume'],
+                stock['high'], stock['low'], stock['open'], stock['symbol']
+            ) for symbol, stock in incoming.items() if symbol in existing])
             
             await db.commit()
+        
+        # The full build happens once, on the first search; after that the index follows the changes
+        if symbol_index.loaded:
+            for symbol in removed:
+                symbol_index.remove(symbol)
+            for stock in added + renamed:
+                symbol_index.upsert(stock)
+        alert_engine.reset()
         return jsonify({"message": "Stocks initialized successfully"}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
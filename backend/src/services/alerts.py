@@ -0,0 +1,243 @@
+import asyncio
+import logging
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('price', 'change_percent')
+DIRECTIONS = ('above', 'below')
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+# {"symbol", "metric"?, "direction", "threshold"} -> (symbol, metric, direction, threshold)
+def parse_alert(raw):
+    if not isinstance(raw, dict):
+        raise ValueError("Alert must be an object")
+    metric = raw.get('metric', 'price')
+    direction = raw.get('direction')
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of: {', '.join(METRICS)}")
+    if direction not in DIRECTIONS:
+        raise ValueError(f"direction must be one of: {', '.join(DIRECTIONS)}")
+    try:
+        symbol = str(raw['symbol']).strip().upper()
+        threshold = float(raw['threshold'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("symbol and a numeric threshold are required")
+    if not symbol:
+        raise ValueError("symbol and a numeric threshold are required")
+    return symbol, metric, direction, threshold
+
+# One symbol/metric/direction's active thresholds, sorted, with the alert ids in
+# a parallel list. A tick that moves the value from `previous` to `current`
+# triggers exactly the thresholds inside that interval: two bisects find the
+# slice and one slice delete disarms it, so untouched alerts cost nothing.
+class ThresholdBook:
+    def __init__(self):
+        self.thresholds = []
+        self.ids = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, threshold, alert_id):
+        i = bisect_right(self.thresholds, threshold)
+        self.thresholds.insert(i, threshold)
+        self.ids.insert(i, alert_id)
+
+    def remove(self, threshold, alert_id):
+        i = bisect_left(self.thresholds, threshold)
+        while i < len(self.ids) and self.thresholds[i] == threshold:
+            if self.ids[i] == alert_id:
+                del self.thresholds[i]
+                del self.ids[i]
+                return True
+            i += 1
+        return False
+
+    def _take(self, lo, hi):
+        ids = self.ids[lo:hi]
+        del self.thresholds[lo:hi]
+        del self.ids[lo:hi]
+        return ids
+
+    def crossed_up(self, previous, current):
+        # previous < threshold <= current
+        return self._take(bisect_right(self.thresholds, previous), bisect_right(self.thresholds, current))
+
+    def crossed_down(self, previous, current):
+        # current <= threshold < previous
+        return self._take(bisect_left(self.thresholds, current), bisect_left(self.thresholds, previous))
+
+# Alerts fire once, on the tick that crosses their threshold. Fired alerts are
+# queued for a batched status update and fanned out to stream subscribers.
+class AlertEngine:
+    def __init__(self):
+        self._books = {}
+        self._alerts = {}
+        self._last = {}
+        self._reference = {}
+        self._subscribers = {}
+        self.pending = []
+        self.loaded = False
+        self.ticks = 0
+        self.triggered = 0
+        self.dropped = 0
+
+    def add(self, alert_id, user_email, symbol, metric, direction, threshold):
+        if alert_id in self._alerts:
+            return
+        self._alerts[alert_id] = (user_email, symbol, metric, direction, threshold)
+        book = self._books.get((symbol, metric, direction))
+        if book is None:
+            book = self._books[(symbol, metric, direction)] = ThresholdBook()
+        book.add(threshold, alert_id)
+
+    # Bulk variant for startup: each book is sorted once instead of insert by insert
+    def load(self, rows):
+        grouped = {}
+        for alert_id, user_email, symbol, metric, direction, threshold in rows:
+            if alert_id in self._alerts:
+                continue
+            self._alerts[alert_id] = (user_email, symbol, metric, direction, threshold)
+            grouped.setdefault((symbol, metric, direction), []).append((threshold, alert_id))
+        for key, entries in grouped.items():
+            book = self._books.get(key)
+            if book is None:
+                book = self._books[key] = ThresholdBook()
+            entries.extend(zip(book.thresholds, book.ids))
+            entries.sort()
+            book.thresholds = [threshold for threshold, _ in entries]
+            book.ids = [alert_id for _, alert_id in entries]
+
+    def remove(self, alert_id):
+        alert = self._alerts.pop(alert_id, None)
+        if alert is None:
+            return False
+        _, symbol, metric, direction, threshold = alert
+        return self._books[(symbol, metric, direction)].remove(threshold, alert_id)
+
+    def set_quote(self, symbol, price, reference=None):
+        self._last[symbol] = price
+        if reference:
+            self._reference[symbol] = reference
+
+    def _crossed(self, symbol, metric, previous, current):
+        if current > previous:
+            book = self._books.get((symbol, metric, 'above'))
+            return book.crossed_up(previous, current) if book else []
+        if current < previous:
+            book = self._books.get((symbol, metric, 'below'))
+            return book.crossed_down(previous, current) if book else []
+        return []
+
+    def on_tick(self, symbol, price, at=None):
+        self.ticks += 1
+        previous = self._last.get(symbol)
+        self._last[symbol] = price
+        if previous is None:
+            return []
+
+        fired = self._crossed(symbol, 'price', previous, price)
+        reference = self._reference.get(symbol)
+        if reference:
+            fired += self._crossed(
+                symbol, 'change_percent',
+                (previous / reference - 1) * 100, (price / reference - 1) * 100
+            )
+        if not fired:
+            return []
+
+        at = at or datetime.now()
+        events = []
+        for alert_id in fired:
+            user_email, _, metric, direction, threshold = self._alerts.pop(alert_id)
+            events.append({
+                "id": alert_id, "user_email": user_email, "symbol": symbol, "metric": metric,
+                "direction": direction, "threshold": threshold, "price": price,
+                "triggered_at": at.isoformat(sep=' '),
+            })
+        self.triggered += len(events)
+        self.pending.extend(events)
+        return events
+
+    def on_quotes(self, quotes, at=None):
+        events = []
+        for quote in quotes:
+            events.extend(self.on_tick(quote['symbol'], quote['price'], at))
+        if events:
+            self.publish(events)
+        return events
+
+    async def ensure_loaded(self, db):
+        if self.loaded:
+            return
+        cursor = await db.execute('SELECT symbol, price, price - COALESCE(change, 0) FROM stocks')
+        for symbol, price, reference in await cursor.fetchall():
+            if price is not None:
+                self.set_quote(symbol, price, reference)
+        cursor = await db.execute('''
+            SELECT id, user_email, stock_symbol, metric, direction, threshold
+            FROM alerts WHERE status = 'active'
+        ''')
+        self.load(await cursor.fetchall())
+        self.loaded = True
+        logger.info(f"Loaded {len(self._alerts)} active alerts")
+
+    def reset(self):
+        # Reloaded from the database on next use, e.g. after the stocks table is rebuilt.
+        # Subscribers and not yet flushed events survive.
+        self._books, self._alerts, self._last, self._reference = {}, {}, {}, {}
+        self.loaded = False
+
+    async def flush(self, db):
+        # One executemany per batch of fired alerts instead of a write per alert
+        if not self.pending:
+            return 0
+        batch, self.pending = self.pending, []
+        try:
+            await db.executemany('''
+                UPDATE alerts SET status = 'triggered', triggered_at = ?, trigger_price = ?
+                WHERE id = ? AND status = 'active'
+            ''', [(event['triggered_at'], event['price'], event['id']) for event in batch])
+            await db.commit()
+        except BaseException:
+            # Events fired while the write was in flight stay queued behind the failed batch
+            self.pending = batch + self.pending
+            raise
+        return len(batch)
+
+    # Each stream gets a bounded queue of its own user's events
+    def subscribe(self, user_email):
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(user_email, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_email, queue):
+        queues = self._subscribers.get(user_email)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_email]
+
+    def publish(self, events):
+        for event in events:
+            for queue in self._subscribers.get(event['user_email'], ()):
+                try:
+                    queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    # A stalled client loses events rather than holding up the quote path
+                    self.dropped += 1
+
+    def stats(self):
+        return {
+            "active": len(self._alerts),
+            "symbols": len({symbol for symbol, _, _ in self._books}),
+            "ticks": self.ticks,
+            "triggered": self.triggered,
+            "pending_writes": len(self.pending),
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "dropped_events": self.dropped,
+        }
+
+alert_engine = AlertEngine()
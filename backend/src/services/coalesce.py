@@ -0,0 +1,73 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+# Single-flight: concurrent calls with the same key await one in-flight computation
+# and share its result. Nothing is cached once the computation finishes.
+class SingleFlight:
+    def __init__(self):
+        self._inflight = {}
+        self.calls = 0
+        self.executions = 0
+
+    async def do(self, key, fn):
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield so one disconnecting client does not cancel the work the others are waiting on
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.calls - self.executions,
+            "in_flight": len(self._inflight),
+        }
+
+# Per-client token bucket. Buckets are kept in LRU order so a flood of distinct
+# clients cannot grow the table without bound.
+class RateLimiter:
+    def __init__(self, rate, burst, max_clients=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.enabled = True
+        self._buckets = OrderedDict()
+        self.allowed = 0
+        self.rejected = 0
+
+    def allow(self, client, cost=1):
+        # Returns (allowed, seconds until enough tokens are available)
+        if not self.enabled:
+            return True, 0.0
+
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+
+        if tokens >= cost:
+            tokens -= cost
+            allowed, retry_after = True, 0.0
+            self.allowed += 1
+        else:
+            allowed, retry_after = False, (cost - tokens) / self.rate
+            self.rejected += 1
+
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+    def stats(self):
+        return {
+            "clients": len(self._buckets),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+        }
@@ -0,0 +1,160 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import numpy as np
+from src.services.prices import price_cache, fetch_last_date
+
+MAX_CACHED_CURVES = 8
+# Enough bars behind the last one to anchor the monthly change
+CHANGE_LOOKBACK_DAYS = 45
+PERIODS = (('daily', 1), ('weekly', 7), ('monthly', 30))
+
+# Daily portfolio value: forward-filled closes (dates x symbols) times the current
+# share counts, plus cash. There is no trade history, so today's holdings are
+# applied to the whole window; dates before every holding has a bar are dropped.
+# Holdings with no bar at all in the window are left out and listed in `missing`.
+class EquityCurve:
+    def __init__(self, dates, values, missing=()):
+        self.dates = dates
+        self.values = values
+        self.missing = missing
+
+    @property
+    def last_date(self):
+        return self.dates[-1] if len(self.dates) else None
+
+    def since(self, start_date):
+        start = np.searchsorted(self.dates, str(start_date), side='left')
+        return EquityCurve(self.dates[start:], self.values[start:], self.missing)
+
+    def value_on(self, date):
+        # Last value on or before `date`
+        i = np.searchsorted(self.dates, str(date), side='right') - 1
+        return self.values[i] if i >= 0 else None
+
+def compute_curve(dates, closes, shares, cash, priced, missing=()):
+    closes, shares = closes[:, priced], shares[priced]
+    valid = ~np.isnan(closes).any(axis=1)
+    return EquityCurve(dates[valid], closes[valid] @ shares + cash, missing)
+
+# Curves keyed by (holdings, cash) and tied to the price matrix revision they were
+# computed from. When the matrix was merged from that revision only the rows past
+# its stale point are recomputed; only a holdings or cash change recomputes it all.
+class EquityCurveCache:
+    def __init__(self, max_entries=MAX_CACHED_CURVES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.extends = 0
+        self.loads = 0
+
+    async def get(self, db, holdings, cash, start_date):
+        symbols = tuple(symbol for symbol, _ in holdings)
+        shares = np.array([count for _, count in holdings], dtype=float)
+        key = (tuple(holdings), float(cash))
+        start_date = str(start_date)
+        prices = await price_cache.get(db, symbols, start_date)
+        entry = self._entries.get(key)
+        # Closes are forward-filled, so a column that is all NaN has no bar up to the window's end
+        priced = ~np.isnan(prices['close']).all(axis=0)
+        missing = tuple(symbol for symbol, has_bars in zip(symbols, priced) if not has_bars)
+
+        usable = (
+            entry is not None and entry[0] <= start_date and entry[1].last_date is not None
+            and entry[1].missing == missing
+        )
+        stale_after = prices.stale_after
+        if usable and prices.revision == entry[2]:
+            loaded_from, curve, _ = entry
+            self.hits += 1
+        elif usable and prices.base == entry[2] and stale_after is not None and stale_after >= start_date:
+            loaded_from, curve, _ = entry
+            keep = curve.dates <= stale_after
+            fresh = prices.since(stale_after)
+            new_rows = fresh.dates > stale_after
+            update = compute_curve(fresh.dates[new_rows], fresh['close'][new_rows], shares, cash, priced)
+            curve = EquityCurve(
+                np.concatenate([curve.dates[keep], update.dates]), np.concatenate([curve.values[keep], update.values]),
+                missing
+            )
+            self.extends += 1
+        else:
+            loaded_from = start_date
+            curve = compute_curve(prices.dates, prices['close'], shares, cash, priced, missing)
+            self.loads += 1
+
+        self._entries[key] = (loaded_from, curve, prices.revision)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return curve.since(start_date)
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "extends": self.extends, "loads": self.loads}
+
+equity_cache = EquityCurveCache()
+
+async def fetch_holdings(db):
+    cursor = await db.execute('''
+        SELECT stock_id, SUM(shares) FROM portfolio_holdings
+        GROUP BY stock_id
+        ORDER BY stock_id
+    ''')
+    return [(symbol, shares) for symbol, shares in await cursor.fetchall()]
+
+# Changes over the last day, week and month of the curve, anchored on its latest bar
+def period_changes(curve):
+    if len(curve.dates) < 2:
+        return None
+    latest = curve.values[-1]
+    last_date = datetime.strptime(curve.last_date[:10], '%Y-%m-%d')
+    changes = {"as_of": curve.last_date, "missing": list(curve.missing)}
+    for name, days in PERIODS:
+        if days == 1:
+            base = curve.values[-2]
+        else:
+            base = curve.value_on((last_date - timedelta(days=days)).date())
+        if base is None:
+            changes[f'{name}_change'] = changes[f'{name}_change_percent'] = None
+            continue
+        changes[f'{name}_change'] = round(float(latest - base), 2)
+        changes[f'{name}_change_percent'] = round(float((latest - base) / base * 100), 2) if base else None
+    return changes
+
+# `db` should come from replica.connect(), as for every other price_cache read; the
+# holdings are passed in so they can be read with the portfolio row they belong to
+async def portfolio_changes(db, holdings, cash):
+    if not holdings:
+        return None
+    last_date = await fetch_last_date(db, [symbol for symbol, _ in holdings])
+    if last_date is None:
+        return None
+    start_date = (datetime.strptime(last_date[:10], '%Y-%m-%d') - timedelta(days=CHANGE_LOOKBACK_DAYS)).date()
+    return period_changes(await equity_cache.get(db, holdings, cash, start_date))
+
+# Largest-Triangle-Three-Buckets: keeps the points that preserve the curve's
+# visual shape. Returns the indices to keep, first and last always included.
+def lttb(values, threshold):
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Third point of the triangle: the mean of the next bucket (or the last point)
+        if i + 2 < len(edges):
+            next_x = x[end:edges[i + 2]].mean()
+            next_y = values[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], values[-1]
+        areas = np.abs(
+            (x[previous] - next_x) * (values[start:end] - values[previous])
+            - (x[previous] - x[start:end]) * (next_y - values[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        keep[i + 1] = previous
+    return keep
@@ -0,0 +1,45 @@
+MAX_PAGE_SIZE = 5000
+NEXT_CURSOR_HEADER = 'X-Next-After'
+
+# fields=a,b,c -> the requested columns in table order. The sort key is always
+# included so the client can read the cursor off the last row.
+def parse_fields(raw, allowed, key):
+    if not raw:
+        return tuple(allowed)
+    requested = {field.strip() for field in raw.split(',') if field.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}. Supported: {', '.join(allowed)}")
+    requested.add(key)
+    return tuple(column for column in allowed if column in requested)
+
+# limit= is optional so existing callers still get the full result; when given it is capped
+def parse_limit(raw, maximum=MAX_PAGE_SIZE):
+    if raw is None:
+        return None
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, maximum)
+
+# Keyset WHERE/ORDER/LIMIT tail. One extra row is read to learn whether another page exists.
+def keyset_clause(key, after, limit, has_where=False):
+    clause, params = '', []
+    if after is not None:
+        clause += f" {'AND' if has_where else 'WHERE'} {key} > ?"
+        params.append(after)
+    clause += f' ORDER BY {key}'
+    if limit is not None:
+        clause += ' LIMIT ?'
+        params.append(limit + 1)
+    return clause, params
+
+# Trims the look-ahead row and returns (rows, headers carrying the next cursor)
+def page(rows, key, limit):
+    if limit is None or len(rows) <= limit:
+        return rows, {}
+    rows = rows[:limit]
+    return rows, {NEXT_CURSOR_HEADER: str(rows[-1][key])}
@@ -0,0 +1,162 @@
+from collections import OrderedDict
+from itertools import count
+import numpy as np
+from src.database.partitions import bars_version, changed_since, latest_date, latest_dates, select_bars
+
+MAX_CACHED_MATRICES = 32
+
+_revisions = count(1)
+
+# Dates x symbols matrices of historical_data fields, forward-filled so every
+# symbol has a value on every date once it has started trading.
+class PriceMatrix:
+    # Every loaded or merged matrix gets a new `revision`. A merge records the one it
+    # was built from as `base`, and `stale_after` as the date after which values may
+    # differ from it (None: anywhere), so derived caches can tell what still holds.
+    def __init__(self, symbols, dates, fields, revision=None, base=None, stale_after=None):
+        self.symbols = tuple(symbols)
+        self.dates = dates
+        self.fields = fields
+        self.revision = next(_revisions) if revision is None else revision
+        self.base = base
+        self.stale_after = stale_after
+
+    @property
+    def last_date(self):
+        return self.dates[-1] if len(self.dates) else None
+
+    def __getitem__(self, field):
+        return self.fields[field]
+
+    def since(self, start_date):
+        # Dates are ISO strings, so lexical order is chronological order
+        start = np.searchsorted(self.dates, str(start_date), side='left')
+        return PriceMatrix(
+            self.symbols, self.dates[start:], {k: v[start:] for k, v in self.fields.items()},
+            self.revision, self.base, self.stale_after
+        )
+
+    # `update` holds the unfilled bars of some columns after `after` (or all of their
+    # bars when None). Those columns are rebuilt past that point, every other column
+    # keeps its values and is carried onto dates it has no bar for.
+    def merge(self, update, after):
+        dates = np.union1d(self.dates, update.dates)
+        rows = np.searchsorted(dates, self.dates)
+        update_rows = np.searchsorted(dates, update.dates)
+        column_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        columns = [column_index[symbol] for symbol in update.symbols]
+        stale = dates > after if after is not None else np.ones(len(dates), dtype=bool)
+        fields = {}
+        for field, values in self.fields.items():
+            merged = np.full((len(dates), len(self.symbols)), np.nan)
+            merged[rows] = values
+            block = merged[:, columns]
+            block[stale] = np.nan
+            block[update_rows] = update.fields[field]
+            merged[:, columns] = block
+            fields[field] = forward_fill(merged)
+        return PriceMatrix(self.symbols, dates, fields, base=self.revision, stale_after=after)
+
+def forward_fill(values):
+    mask = np.isnan(values)
+    if not mask.any():
+        return values
+    index = np.where(~mask, np.arange(values.shape[0])[:, None], 0)
+    np.maximum.accumulate(index, axis=0, out=index)
+    return values[index, np.arange(values.shape[1])]
+
+async def fetch_last_date(db, symbols):
+    return await latest_date(db, symbols)
+
+# fill=False leaves NaN where a symbol has no bar, for callers that must not invent prices
+async def load_price_matrix(db, symbols, fields=('close',), start_date=None, after_date=None, fill=True):
+    symbols = tuple(symbols)
+    column_index = {symbol: i for i, symbol in enumerate(symbols)}
+    # Only partitions overlapping the requested range are read
+    rows = await select_bars(
+        db, ('stock_symbol', 'date') + tuple(fields), symbols,
+        start=start_date, after=after_date, order_by=None
+    )
+
+    if not rows:
+        return PriceMatrix(symbols, np.array([], dtype=str), {f: np.empty((0, len(symbols))) for f in fields})
+
+    # Scatter the long (symbol, date, values) rows into the dense matrix in one pass.
+    # Rows are walked as they come: transposing them with zip(*rows), or np.unique
+    # over the date strings, costs more than the scatter itself on large universes.
+    dates = sorted({row[1] for row in rows})
+    row_index = {date: i for i, date in enumerate(dates)}
+    date_index = np.fromiter((row_index[row[1]] for row in rows), dtype=np.intp, count=len(rows))
+    symbol_index = np.fromiter((column_index[row[0]] for row in rows), dtype=np.intp, count=len(rows))
+    values = np.array([row[2:] for row in rows], dtype=float).reshape(len(rows), len(fields))
+    dates = np.array(dates, dtype=str)
+
+    matrices = {}
+    for i, field in enumerate(fields):
+        matrix = np.full((len(dates), len(symbols)), np.nan)
+        matrix[date_index, symbol_index] = values[:, i]
+        matrices[field] = forward_fill(matrix) if fill else matrix
+    return PriceMatrix(symbols, dates, matrices)
+
+# LRU of price matrices keyed by (symbols, fields), each stamped with the bar
+# catalog version it reflects. A lookup reads that one-row version: unchanged, or
+# older as on a lagging replica, is a hit with no further queries. Otherwise only
+# the symbols the catalog stamped since are read again: from their previous last
+# date when they only gained bars, from the start of the entry when bars were
+# rewritten or removed.
+class PriceMatrixCache:
+    def __init__(self, max_entries=MAX_CACHED_MATRICES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.extends = 0
+        self.loads = 0
+
+    async def get(self, db, symbols, start_date, fields=('close',)):
+        key = (tuple(symbols), tuple(fields))
+        start_date = str(start_date)
+        epoch, version = await bars_version(db)
+        entry = self._entries.get(key)
+
+        if entry is not None and entry[0] <= start_date and entry[1].last_date is not None and entry[3] == epoch:
+            loaded_from, matrix, known, _, seen = entry
+            changed = {}
+            if version > seen:
+                wanted = set(key[0])
+                changed = {s: d for s, d in (await changed_since(db, seen)).items() if s in wanted}
+                seen = version
+            if not changed:
+                self.hits += 1
+            else:
+                matrix, known = await self._update(db, matrix, known, changed, fields, loaded_from)
+                self.extends += 1
+        else:
+            loaded_from, seen = start_date, version
+            known = await latest_dates(db, symbols)
+            matrix = await load_price_matrix(db, symbols, fields, start_date=start_date)
+            self.loads += 1
+
+        self._entries[key] = (loaded_from, matrix, known, epoch, seen)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return matrix.since(start_date)
+
+    @staticmethod
+    async def _update(db, matrix, known, changed, fields, loaded_from):
+        previous = [known.get(symbol) for symbol in changed]
+        appended = None not in previous and all(d is not None and d > known[s] for s, d in changed.items())
+        after = min(previous) if appended else None
+        update = await load_price_matrix(db, list(changed), fields, start_date=loaded_from, after_date=after, fill=False)
+        known = dict(known)
+        for symbol, last_date in changed.items():
+            if last_date is None:
+                known.pop(symbol, None)
+            else:
+                known[symbol] = last_date
+        return matrix.merge(update, after), known
+
+    def clear(self):
+        self._entries.clear()
+
+price_cache = PriceMatrixCache()
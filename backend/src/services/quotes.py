@@ -0,0 +1,58 @@
+import math
+from datetime import datetime
+
+MAX_QUOTES_PER_BATCH = 5000
+
+# change/change_percent stay relative to the previous close, recovered from the
+# row's own price - change. SET expressions read the pre-update values.
+UPDATE_QUOTE = '''
+    UPDATE stocks SET
+        change = :price - (price - COALESCE(change, 0)),
+        change_percent = (:price - (price - COALESCE(change, 0))) * 100.0 / NULLIF(price - COALESCE(change, 0), 0),
+        price = :price,
+        high = MAX(COALESCE(high, :high), :high),
+        low = MIN(COALESCE(low, :low), :low),
+        open = COALESCE(:open, open),
+        volume = COALESCE(volume, 0) + :volume,
+        updated_at = :updated_at
+    WHERE symbol = :symbol
+'''
+
+# [{"symbol", "price", "volume"?, "high"?, "low"?, "open"?}] -> bound parameter dicts
+def parse_quotes(raw):
+    if not isinstance(raw, list) or not raw:
+        raise ValueError("quotes must be a non-empty list")
+    if len(raw) > MAX_QUOTES_PER_BATCH:
+        raise ValueError(f"At most {MAX_QUOTES_PER_BATCH} quotes per batch")
+
+    quotes = []
+    for quote in raw:
+        try:
+            symbol = str(quote['symbol']).upper()
+            price = float(quote['price'])
+            quotes.append({
+                "symbol": symbol,
+                "price": price,
+                "high": float(quote.get('high', price)),
+                "low": float(quote.get('low', price)),
+                "open": float(quote['open']) if quote.get('open') is not None else None,
+                "volume": int(quote.get('volume', 0)),
+            })
+        except (KeyError, TypeError, ValueError, AttributeError, OverflowError):
+            raise ValueError(f"Invalid quote: {quote}")
+        # float() accepts "nan" and "inf", which would poison stored prices and alert comparisons
+        values = [quotes[-1][field] for field in ('price', 'high', 'low', 'open')]
+        if not all(math.isfinite(value) for value in values if value is not None):
+            raise ValueError(f"Invalid quote: {quote}")
+        if price <= 0:
+            raise ValueError(f"Invalid price for {symbol}: {price}")
+    return quotes
+
+# Applies a batch in one transaction so readers never see half a tick
+async def apply_quotes(db, quotes, now=None):
+    updated_at = now or datetime.now()
+    for quote in quotes:
+        quote['updated_at'] = updated_at
+    cursor = await db.executemany(UPDATE_QUOTE, quotes)
+    await db.commit()
+    return cursor.rowcount, updated_at
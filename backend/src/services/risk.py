@@ -0,0 +1,117 @@
+from collections import OrderedDict
+from statistics import NormalDist
+import numpy as np
+
+TRADING_DAYS = 252
+MAX_CACHED_STATS = 8
+
+def daily_returns(closes):
+    # Simple returns; days before a symbol has any price contribute a zero return
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = closes[1:] / closes[:-1] - 1.0
+    return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+# Per-holding statistics that do not depend on the weights: the return matrix,
+# its centred copy, each holding's volatility, and the correlation matrix (built
+# on first request, already rounded and converted for the response).
+class ReturnStats:
+    def __init__(self, closes):
+        self.returns = daily_returns(closes)
+        self.observations = self.returns.shape[0]
+        self.centered = self.returns - self.returns.mean(axis=0)
+        self.asset_vol = self.centered.std(axis=0, ddof=1) if self.observations >= 2 else None
+        self._correlation = None
+
+    def correlation(self):
+        if self._correlation is None:
+            # Reuse the centred matrix and volatilities rather than letting corrcoef recompute them
+            with np.errstate(divide='ignore', invalid='ignore'):
+                correlation = (self.centered.T @ self.centered) / (self.observations - 1) / np.outer(self.asset_vol, self.asset_vol)
+            correlation = np.nan_to_num(correlation, nan=0.0, posinf=0.0, neginf=0.0)
+            self._correlation = correlation.round(4).tolist()
+        return self._correlation
+
+# ReturnStats keyed by (symbols, window start) and tied to the price matrix revision
+# they came from, so only a new bar or a holdings change recomputes them; share
+# counts and quotes only change the weights.
+class ReturnStatsCache:
+    def __init__(self, max_entries=MAX_CACHED_STATS):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.loads = 0
+
+    def get(self, prices, start_date):
+        key = (prices.symbols, str(start_date))
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == prices.revision:
+            stats = entry[1]
+            self.hits += 1
+        else:
+            stats = ReturnStats(prices['close'])
+            self.loads += 1
+        self._entries[key] = (prices.revision, stats)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return stats
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "loads": self.loads}
+
+return_stats_cache = ReturnStatsCache()
+
+# All metrics come from one (dates x holdings) return matrix; nothing loops per holding.
+def portfolio_risk(symbols, stats, weights, portfolio_value, confidence=0.95, horizon_days=1, include_correlation=True):
+    returns, centered, observations = stats.returns, stats.centered, stats.observations
+    if observations < 2:
+        return None
+
+    portfolio_returns = returns @ weights
+    portfolio_centered = portfolio_returns - portfolio_returns.mean()
+
+    asset_vol = stats.asset_vol
+    portfolio_vol = portfolio_centered.std(ddof=1)
+    annualize = np.sqrt(TRADING_DAYS)
+
+    # Beta of each holding against the portfolio itself (no market index is stored)
+    portfolio_var = portfolio_vol ** 2
+    covariance = centered.T @ portfolio_centered / (observations - 1)
+    betas = covariance / portfolio_var if portfolio_var > 0 else np.zeros_like(covariance)
+
+    # Historical VaR/ES from the empirical distribution, parametric VaR from a normal fit
+    horizon = np.sqrt(horizon_days)
+    cutoff = np.quantile(portfolio_returns, 1 - confidence)
+    tail = portfolio_returns[portfolio_returns <= cutoff]
+    z = NormalDist().inv_cdf(confidence)
+    historical_var = -cutoff * horizon * portfolio_value
+    expected_shortfall = -tail.mean() * horizon * portfolio_value if len(tail) else historical_var
+    parametric_var = (z * portfolio_vol - portfolio_returns.mean()) * horizon * portfolio_value
+
+    result = {
+        "observations": int(observations),
+        "confidence": confidence,
+        "horizon_days": horizon_days,
+        "portfolio_value": float(portfolio_value),
+        "portfolio_volatility": float(portfolio_vol * annualize),
+        "historical_var": float(max(historical_var, 0.0)),
+        "expected_shortfall": float(max(expected_shortfall, 0.0)),
+        "parametric_var": float(max(parametric_var, 0.0)),
+        "holdings": [
+            {
+                "symbol": symbol,
+                "weight": float(weight),
+                "volatility": float(vol * annualize),
+                "beta": float(beta),
+            }
+            for symbol, weight, vol, beta in zip(symbols, weights, asset_vol, betas)
+        ],
+    }
+
+    if include_correlation:
+        result["correlation"] = {"symbols": list(symbols), "matrix": stats.correlation()}
+
+    return result
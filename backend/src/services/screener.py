@@ -0,0 +1,180 @@
+import math
+import numpy as np
+
+FIELDS = ('close', 'high', 'low', 'volume')
+# Calendar days loaded into the screening matrix; enough for 200-bar windows plus warm-up
+LOOKBACK_DAYS = 400
+
+# Each criterion receives the (dates x symbols) field matrices and returns a boolean
+# mask over symbols plus any per-symbol metrics worth returning to the client.
+# Everything is evaluated across the whole universe at once.
+
+def _require_bars(matrix, bars):
+    if matrix['close'].shape[0] < bars:
+        raise ValueError(f"Not enough history: criterion needs {bars} bars")
+
+def _ewm(values, alpha):
+    # Recursive EMA along the date axis, vectorised across symbols; seeds on each symbol's first price
+    result = np.empty_like(values)
+    state = values[0].copy()
+    result[0] = state
+    for t in range(1, values.shape[0]):
+        current = values[t]
+        state = np.where(np.isnan(state), current, alpha * current + (1 - alpha) * state)
+        result[t] = state
+    return result
+
+def _rsi(close, length):
+    delta = np.diff(close, axis=0)
+    gains = np.where(delta > 0, delta, 0.0)
+    losses = np.where(delta < 0, -delta, 0.0)
+    # Wilder smoothing, as pandas_ta.rsi uses in the trading bot
+    avg_gain = _ewm(gains, 1.0 / length)[-1]
+    avg_loss = _ewm(losses, 1.0 / length)[-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        rsi = 100.0 - 100.0 / (1.0 + rs)
+    return np.where(avg_loss == 0, 100.0, rsi)
+
+def n_day_high(matrix, window=20):
+    window = int(window)
+    _require_bars(matrix, window + 1)
+    # Prior window only, mirroring range_high_shifted in breakout_strategy
+    range_high = np.max(matrix['high'][-window - 1:-1], axis=0)
+    close = matrix['close'][-1]
+    return close > range_high, {f"high_{window}d": range_high}
+
+def n_day_low(matrix, window=20):
+    window = int(window)
+    _require_bars(matrix, window + 1)
+    range_low = np.min(matrix['low'][-window - 1:-1], axis=0)
+    close = matrix['close'][-1]
+    return close < range_low, {f"low_{window}d": range_low}
+
+def volume_surge(matrix, window=10, multiplier=1.2):
+    window = int(window)
+    _require_bars(matrix, window)
+    volume_ma = np.mean(matrix['volume'][-window:], axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = matrix['volume'][-1] / volume_ma
+    return ratio > float(multiplier), {"volume_ratio": ratio}
+
+def rsi(matrix, length=14, lower=None, upper=None):
+    length = int(length)
+    _require_bars(matrix, length + 1)
+    values = _rsi(matrix['close'], length)
+    mask = ~np.isnan(values)
+    if lower is not None:
+        mask &= values >= float(lower)
+    if upper is not None:
+        mask &= values <= float(upper)
+    return mask, {f"rsi_{length}": values}
+
+def ema_cross(matrix, fast=8, slow=21, direction='bullish', within=1):
+    fast, slow, within = int(fast), int(slow), int(within)
+    _require_bars(matrix, slow + within)
+    if direction not in ('bullish', 'bearish'):
+        raise ValueError("direction must be 'bullish' or 'bearish'")
+
+    close = matrix['close']
+    spread = _ewm(close, 2.0 / (fast + 1)) - _ewm(close, 2.0 / (slow + 1))
+    above = spread > 0 if direction == 'bullish' else spread < 0
+    # Crossed if the fast EMA is on the requested side now but was not at some point in the last `within` bars
+    recent = above[-within - 1:]
+    mask = recent[-1] & ~recent[:-1].all(axis=0)
+    return mask, {f"ema_{fast}_{slow}_spread": spread[-1]}
+
+CRITERIA = {
+    'n_day_high': n_day_high,
+    'n_day_low': n_day_low,
+    'volume_surge': volume_surge,
+    'rsi': rsi,
+    'ema_cross': ema_cross,
+}
+
+# Request keys that differ from the criterion's parameter names
+PARAM_ALIASES = {
+    'rsi': {'min': 'lower', 'max': 'upper'},
+}
+
+# Parameters checked up front, so a bad value is a 400 rather than a numpy error mid-screen
+POSITIVE_INT_PARAMS = ('window', 'length', 'fast', 'slow', 'within')
+FINITE_PARAMS = ('multiplier', 'min', 'max', 'lower', 'upper')
+
+def _positive_int(name, value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ValueError(f"{name} must be a positive integer")
+    return value
+
+def _finite(name, value):
+    try:
+        if isinstance(value, bool):
+            raise TypeError
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number")
+    if not math.isfinite(value):
+        raise ValueError(f"{name} must be a finite number")
+    return value
+
+# Checked on the request's own keys so messages name what the client sent
+def _check_params(name, raw):
+    params = {}
+    for key, value in raw.items():
+        if key in POSITIVE_INT_PARAMS:
+            value = _positive_int(f"{name}.{key}", value)
+        elif key in FINITE_PARAMS and value is not None:
+            value = _finite(f"{name}.{key}", value)
+        params[PARAM_ALIASES.get(name, {}).get(key, key)] = value
+    if name == 'ema_cross' and params.get('fast', 8) >= params.get('slow', 21):
+        raise ValueError("ema_cross.fast must be less than ema_cross.slow")
+    lower, upper = params.get('lower'), params.get('upper')
+    if name == 'rsi' and lower is not None and upper is not None and lower > upper:
+        raise ValueError("rsi.min must not exceed rsi.max")
+    return params
+
+def parse_criteria(raw):
+    if not isinstance(raw, list) or not raw:
+        raise ValueError("criteria must be a non-empty list")
+
+    parsed = []
+    for criterion in raw:
+        if not isinstance(criterion, dict) or criterion.get('type') not in CRITERIA:
+            raise ValueError(f"Unknown criterion: {criterion}. Supported: {', '.join(CRITERIA)}")
+        params = {k: v for k, v in criterion.items() if k != 'type'}
+        parsed.append((CRITERIA[criterion['type']], _check_params(criterion['type'], params)))
+    return parsed
+
+def screen(matrix, criteria, limit=100, sort_by=None, descending=True):
+    symbols = np.array(matrix.symbols)
+    mask = np.ones(len(symbols), dtype=bool)
+    metrics = {"close": matrix['close'][-1]}
+
+    for criterion, params in criteria:
+        try:
+            criterion_mask, criterion_metrics = criterion(matrix, **params)
+        except TypeError as e:
+            raise ValueError(f"Invalid parameters for {criterion.__name__}: {e}")
+        mask &= criterion_mask
+        metrics.update(criterion_metrics)
+
+    matches = np.flatnonzero(mask)
+    if sort_by is not None:
+        if sort_by not in metrics:
+            raise ValueError(f"Cannot sort by {sort_by}. Available: {', '.join(metrics)}")
+        values = metrics[sort_by][matches]
+        # argsort puts NaN last; negating for descending order keeps it there
+        matches = matches[np.argsort(-values if descending else values, kind='stable')]
+
+    results = []
+    for i in matches[:limit]:
+        row = {"symbol": str(symbols[i])}
+        for name, values in metrics.items():
+            value = values[i]
+            row[name] = None if np.isnan(value) else round(float(value), 4)
+        results.append(row)
+    return {"matched": int(len(matches)), "results": results}
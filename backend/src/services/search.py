@@ -0,0 +1,125 @@
+import aiosqlite
+from bisect import bisect_left, insort
+
+# In-memory prefix index over stock symbols and names.
+# Both indexes are sorted lists of (key, symbol) tuples so a prefix lookup is a
+# single bisect followed by a scan of the matching run, independent of universe size.
+class SymbolSearchIndex:
+    def __init__(self):
+        self._symbol_keys = []
+        self._name_keys = []
+        self._records = {}
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._records)
+
+    @staticmethod
+    def _name_tokens(name):
+        # Index every word-boundary suffix of the name so "inc" and "apple inc" both hit "Apple Inc."
+        words = name.lower().split()
+        return {' '.join(words[i:]) for i in range(len(words))}
+
+    def rebuild(self, stocks):
+        records = {stock['symbol']: self._record(stock) for stock in stocks}
+        self._records = records
+        self._symbol_keys = sorted((symbol.lower(), symbol) for symbol in records)
+        self._name_keys = sorted(
+            (token, symbol)
+            for symbol, record in records.items()
+            for token in self._name_tokens(record['name'])
+        )
+        self.loaded = True
+
+    # Incremental maintenance for one stock: only its own keys move
+    def upsert(self, stock):
+        record = self._record(stock)
+        previous = self._records.get(record['symbol'])
+        if previous == record:
+            return
+        if previous is not None:
+            self._remove_keys(previous)
+        self._records[record['symbol']] = record
+        insort(self._symbol_keys, (record['symbol'].lower(), record['symbol']))
+        for token in self._name_tokens(record['name']):
+            insort(self._name_keys, (token, record['symbol']))
+
+    def remove(self, symbol):
+        record = self._records.pop(symbol, None)
+        if record is not None:
+            self._remove_keys(record)
+
+    def _remove_keys(self, record):
+        symbol = record['symbol']
+        self._delete(self._symbol_keys, (symbol.lower(), symbol))
+        for token in self._name_tokens(record['name']):
+            self._delete(self._name_keys, (token, symbol))
+
+    @staticmethod
+    def _delete(keys, key):
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            del keys[i]
+
+    def search(self, query, limit=10):
+        prefix = query.strip().lower()
+        if not prefix:
+            return []
+
+        # Symbol matches rank ahead of name matches; an exact symbol sorts first in its run
+        symbols = self._scan(self._symbol_keys, prefix, limit)
+        if len(symbols) < limit:
+            for symbol in self._scan(self._name_keys, prefix, limit * 2):
+                if symbol not in symbols:
+                    symbols.append(symbol)
+                    if len(symbols) == limit:
+                        break
+        return [self._records[symbol] for symbol in symbols]
+
+    @staticmethod
+    def _scan(keys, prefix, limit):
+        matches = []
+        i = bisect_left(keys, (prefix,))
+        while i < len(keys) and len(matches) < limit:
+            key, symbol = keys[i]
+            if not key.startswith(prefix):
+                break
+            if symbol not in matches:
+                matches.append(symbol)
+            i += 1
+        return matches
+
+    @staticmethod
+    def _record(stock):
+        return {"symbol": stock['symbol'], "name": stock['name'], "sector": stock.get('sector')}
+
+symbol_index = SymbolSearchIndex()
+
+async def load_index(db):
+    db.row_factory = aiosqlite.Row
+    cursor = await db.execute('SELECT symbol, name, sector FROM stocks')
+    symbol_index.rebuild([dict(row) for row in await cursor.fetchall()])
+
+# Typo-tolerant fallback over the trigram FTS5 table: any shared trigram is a
+# candidate and bm25 puts the closest names first.
+async def fuzzy_search(db, query, limit=10):
+    trigrams = {query.lower()[i:i + 3] for i in range(len(query) - 2)}
+    trigrams = [t for t in trigrams if '"' not in t]
+    if not trigrams:
+        return []
+
+    match = ' OR '.join(f'"{t}"' for t in trigrams)
+    db.row_factory = aiosqlite.Row
+    try:
+        cursor = await db.execute('''
+            SELECT s.symbol, s.name, s.sector
+            FROM stocks_fts f
+            JOIN stocks s ON s.id = f.rowid
+            WHERE stocks_fts MATCH ?
+            ORDER BY bm25(stocks_fts)
+            LIMIT ?
+        ''', (match, limit))
+    except aiosqlite.OperationalError:
+        # SQLite built without FTS5/trigram support
+        return []
+    return [dict(row) for row in await cursor.fetchall()]
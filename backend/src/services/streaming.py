@@ -0,0 +1,128 @@
+import zlib
+import aiosqlite
+import orjson
+from quart import Response
+from src.database.database import DATABASE_PATH
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+CHUNK_ROWS = 1000
+
+# Yields lists of row dicts straight off the cursor so memory stays bounded by
+# CHUNK_ROWS instead of growing with the result set.
+async def fetch_chunks(query, params=(), db_path=DATABASE_PATH, chunk_rows=CHUNK_ROWS):
+    async with aiosqlite.connect(db_path) as db:
+        async for chunk in iter_cursor(db, query, params, chunk_rows):
+            yield chunk
+
+# Same, on a connection the caller already holds
+async def iter_cursor(db, query, params=(), chunk_rows=CHUNK_ROWS):
+    cursor = await db.execute(query, params)
+    columns = [column[0] for column in cursor.description]
+    while True:
+        rows = await cursor.fetchmany(chunk_rows)
+        if not rows:
+            break
+        yield [dict(zip(columns, row)) for row in rows]
+
+async def fetch_rows(query, params=(), db_path=DATABASE_PATH):
+    # Materialised variant for results that are shared between requests
+    rows = []
+    async for chunk in fetch_chunks(query, params, db_path):
+        rows.extend(chunk)
+    return rows
+
+async def iter_chunks(rows, chunk_rows=CHUNK_ROWS):
+    # Adapts an already materialised list of rows to the streaming encoder
+    for i in range(0, len(rows), chunk_rows):
+        yield rows[i:i + chunk_rows]
+
+def negotiate_encoding(accept_encoding):
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        token, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if token:
+            accepted[token.lower()] = quality
+
+    if brotli is not None and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+class GzipEncoder:
+    def __init__(self):
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def encode(self, data):
+        # Sync flush so each chunk reaches the client instead of waiting in the deflate window
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+class BrotliEncoder:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=5)
+
+    def encode(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+_ENCODERS = {'gzip': GzipEncoder, 'br': BrotliEncoder}
+
+async def encode_array(chunks):
+    first = True
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        # orjson encodes the whole chunk in one call; strip its brackets to splice into one array
+        body = orjson.dumps(chunk)[1:-1]
+        yield (b'[' if first else b',') + body
+        first = False
+    yield b'[]' if first else b']'
+
+async def encode_ndjson(chunks):
+    async for chunk in chunks:
+        if chunk:
+            yield b'\n'.join(orjson.dumps(row) for row in chunk) + b'\n'
+
+async def compress(body, encoder):
+    async for data in body:
+        compressed = encoder.encode(data)
+        if compressed:
+            yield compressed
+    yield encoder.finish()
+
+def wants_ndjson(request):
+    return (
+        request.args.get('format') == 'ndjson'
+        or 'application/x-ndjson' in request.headers.get('Accept', '')
+    )
+
+# Builds a chunked response from an async iterable of row-dict lists. The request is
+# only read here, before streaming starts, so the body generator needs no request context.
+def json_stream_response(chunks, request, headers=None):
+    ndjson = wants_ndjson(request)
+    body = encode_ndjson(chunks) if ndjson else encode_array(chunks)
+    response_headers = {'Vary': 'Accept-Encoding'}
+    response_headers.update(headers or {})
+
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    if encoding:
+        body = compress(body, _ENCODERS[encoding]())
+        response_headers['Content-Encoding'] = encoding
+
+    mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+    return Response(body, mimetype=mimetype, headers=response_headers)
@@ -12,31 +12,53 @@ import {
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs';
 import { HistoricalDataPoint, Timeframe } from '../../types/finance';
+import { PortfolioPerformance } from '../../services/api';
+
+// The portfolio curve is downsampled server-side to about the chart's width
+const PORTFOLIO_POINTS = 300;
+
+interface ChartPoint {
+  date: string;
+  close: number;
+}
 
 interface PerformanceChartProps {
   selectedStock: string | null;
   selectedTimeframe: Timeframe;
   onTimeframeChange: (timeframe: Timeframe) => void;
   getHistoricalData: (symbol: string, timeframe: Timeframe) => Promise<HistoricalDataPoint[]>;
+  // Without a selected stock the chart shows the portfolio's value instead
+  getPortfolioPerformance?: (timeframe: Timeframe, points: number) => Promise<PortfolioPerformance | null>;
 }
 
 const PerformanceChart = ({
   selectedStock,
   selectedTimeframe,
   onTimeframeChange,
-  getHistoricalData
+  getHistoricalData,
+  getPortfolioPerformance
 }: PerformanceChartProps) => {
-  const [chartData, setChartData] = useState<HistoricalDataPoint[]>([]);
+  const [chartData, setChartData] = useState<ChartPoint[]>([]);
   const [startValue, setStartValue] = useState<number>(0);
+  const [missing, setMissing] = useState<string[]>([]);
   const [isLoading, setIsLoading] = useState(false);
+  const showPortfolio = !selectedStock && !!getPortfolioPerformance;
   
   useEffect(() => {
     const loadData = async () => {
-      if (!selectedStock) return;
+      if (!selectedStock && !getPortfolioPerformance) return;
       
       setIsLoading(true);
       try {
-        const data = await getHistoricalData(selectedStock, selectedTimeframe);
+        let data: ChartPoint[];
+        if (selectedStock) {
+          data = await getHistoricalData(selectedStock, selectedTimeframe);
+          setMissing([]);
+        } else {
+          const performance = await getPortfolioPerformance!(selectedTimeframe, PORTFOLIO_POINTS);
+          data = performance ? performance.dates.map((date, i) => ({ date, close: performance.values[i] })) : [];
+          setMissing(performance?.missing ?? []);
+        }
         setChartData(data);
         if (data.length > 0) {
           setStartValue(data[0].close);
@@ -49,7 +71,7 @@ const PerformanceChart = ({
     };
 
     loadData();
-  }, [selectedStock, selectedTimeframe, getHistoricalData]);
+  }, [selectedStock, selectedTimeframe, getHistoricalData, getPortfolioPerformance]);
 
   // Calculate price change
   const lastPrice = chartData.length > 0 ? chartData[chartData.length - 1].close : 0;
@@ -63,8 +85,9 @@ const PerformanceChart = ({
           <div>
             <CardTitle>Performance</CardTitle>
             <CardDescription>
-              {selectedStock ? (
+              {selectedStock || (showPortfolio && chartData.length > 0) ? (
                 <div className="flex items-baseline gap-2">
+                  {showPortfolio && <span>Portfolio value</span>}
                   <span>
                     ${lastPrice.toFixed(2)}
                   </span>
@@ -75,6 +98,11 @@ const PerformanceChart = ({
               ) : (
                 'Select a stock to view performance'
               )}
+              {showPortfolio && missing.length > 0 && (
+                <span className="block text-xs">
+                  Excludes {missing.join(', ')} (no price history in this period)
+                </span>
+              )}
             </CardDescription>
           </div>
           
@@ -98,7 +126,7 @@ const PerformanceChart = ({
               <p className="mt-2 text-sm text-muted-foreground">Loading data...</p>
             </div>
           </div>
-        ) : !selectedStock ? (
+        ) : !selectedStock && (!showPortfolio || chartData.length === 0) ? (
           <div className="h-[300px] flex items-center justify-center text-muted-foreground">
             Select a stock to view performance
           </div>
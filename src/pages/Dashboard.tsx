@@ -6,6 +6,7 @@ import {
   updatePortfolio,
   getHistoricalData,
   getPortfolioAllocation,
+  getPortfolioPerformance,
   initializeStocksData
 } 
 
@@ -160,6 +161,7 @@ const Dashboard = () => {
                   selectedTimeframe={selectedTimeframe}
                   onTimeframeChange={setSelectedTimeframe}
                   getHistoricalData={getHistoricalData}
+                  getPortfolioPerformance={getPortfolioPerformance}
                 />
                 
                 <AllocationChart 
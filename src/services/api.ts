@@ -96,6 +96,29 @@ export const getWatchlistStocks = async (watchlistId: number) => {
   return response.json();
 };
 
+export interface PortfolioPerformance {
+  dates: string[];
+  values: number[];
+  points: number;
+  changes: Record<string, number | string | null> | null;
+  // Holdings with no price history in the window, left out of the values
+  missing: string[];
+}
+
+// points downsamples the curve server-side for the chart width
+export const getPortfolioPerformance = async (timeframe: string = '1Y', points?: number): Promise<PortfolioPerformance | null> => {
+  const params = new URLSearchParams({ timeframe, ...(points ? { points: String(points) } : {}) });
+  const response = await fetch(`${API_BASE_URL}/portfolio/performance?${params}`, {
+    headers: getAuthHeaders()
+  });
+  
+  if (!response.ok) {
+    throw new Error('Failed to fetch portfolio performance');
+  }
+  
+  return response.json();
+};
+
 // Public endpoints
 export const getStocks = async () => {
   const response = await fetch(`${API_BASE_URL}/stocks`);
@@ -127,6 +150,32 @@ export const getHistoricalData = async (symbol: string, timeframe: string = '1M'
   return response.json();
 };
 
+export interface BatchHistoricalData {
+  timeframe: string;
+  dates: string[];
+  symbols: Record<string, Record<string, (number | null)[]>>;
+  missing: string[];
+}
+
+export const getBatchHistoricalData = async (
+  symbols: string[],
+  timeframe: string = '1M',
+  fields: string[] = ['close']
+): Promise<BatchHistoricalData> => {
+  const params = new URLSearchParams({
+    symbols: symbols.join(','),
+    timeframe,
+    fields: fields.join(',')
+  });
+  const response = await fetch(`${API_BASE_URL}/stocks/historical?${params}`);
+  
+  if (!response.ok) {
+    throw new Error('Failed to fetch historical data');
+  }
+  
+  return response.json();
+};
+
 // Initialize stocks data
 export const initializeStocksData = async (data: { stocks: any[] }) => {
   const response = await fetch(`${API_BASE_URL}/stocks/init`, {
@@ -168,6 +217,7 @@ export default {
   getPortfolio,
   getLatestPortfolio,
   getPortfolioAllocation,
+  getPortfolioPerformance,
   getWatchlists,
   createWatchlist,
   addStockToWatchlist,
@@ -1,5 +1,5 @@
 import { Stock, Portfolio, PortfolioAllocation, HistoricalDataPoint, Timeframe } from '../types/finance';
-import api from './api';
+import api, { PortfolioPerformance } from './api';
 
 // Mock stock data
 const mockStocks: Stock[] = [
@@ -236,6 +236,16 @@ export const getPortfolioAllocation = async (): Promise<PortfolioAllocation[]> =
   }
 };
 
+// Portfolio equity curve; no mock fallback, a made-up value history would mislead
+export const getPortfolioPerformance = async (timeframe: Timeframe, points: number): Promise<PortfolioPerformance | null> => {
+  try {
+    return await api.getPortfolioPerformance(timeframe, points);
+  } catch (error) {
+    console.error('Error fetching portfolio performance:', error);
+    return null;
+  }
+};
+
 export const initializeStocksData = async (): Promise<void> => {
   try {
     // First check if we already have data initialized